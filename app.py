@@ -1,23 +1,26 @@
-from typing import Dict, Any, Tuple
+"""
+Legacy synchronous AVRDisco-Web application using Flask.
+
+The default entry point is async_app.py (Quart + asyncio), which multiplexes
+receiver I/O on one event loop instead of blocking a worker thread per request.
+"""
+from typing import Dict, Any, Optional, Tuple
 from flask import Flask, render_template, request, jsonify, Response
 from flask_socketio import SocketIO, emit
 import logging
-import time
 import sys
-from config import Config
+from config import Config, configure_logging
+from cached_page import CachedPage, CACHE_CONTROL
 from avr_controller import AVRController
 from avr_commands import AVR_COMMANDS, COMMAND_GROUPS, COMMAND_LABELS
-from command_validator import validate_custom_command, sanitize_command
+from handlers import resolve_command_batch, resolve_custom_command
 
 # Initialize config - skip arg parsing if running under pytest
 _is_testing = 'pytest' in sys.modules
 config = Config(parse_args=not _is_testing)
 
 # Setup logging with configurable level
-logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging(config.LOG_LEVEL)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -30,12 +33,30 @@ socketio = SocketIO(app, cors_allowed_origins=cors_origins)
 # Initialize AVR controller
 avr = AVRController(config.AVR_HOST, config.AVR_PORT, config.AVR_TIMEOUT, config.DEBUG)
 
+# Rendered on first request (url_for needs a request context) and reused,
+# since the command groups and labels never change at runtime
+_index_page: Optional[CachedPage] = None
+
 @app.route('/')
-def index() -> str:
-    """Render main web interface."""
-    return render_template('index.html',
-                         command_groups=COMMAND_GROUPS,
-                         command_labels=COMMAND_LABELS)
+def index() -> Response:
+    """Serve the pre-rendered main web interface."""
+    global _index_page
+    if _index_page is None:
+        _index_page = CachedPage(render_template('index.html',
+                                                 command_groups=COMMAND_GROUPS,
+                                                 command_labels=COMMAND_LABELS))
+
+    body, etag, encoding = _index_page.select(request.accept_encodings)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 @app.route('/api/connect', methods=['POST'])
 def connect_avr() -> Response:
@@ -49,10 +70,16 @@ def disconnect_avr() -> Response:
     avr.disconnect()
     return jsonify({'success': True, 'connected': avr.connected})
 
+# The status payload only depends on one boolean, so both bodies are encoded once
+_STATUS_BODIES = {connected: f"{app.json.dumps({'connected': connected})}\n"
+                  for connected in (True, False)}
+
 @app.route('/api/status', methods=['GET'])
 def get_status() -> Response:
     """Get current connection status."""
-    return jsonify({'connected': avr.connected})
+    response = Response(_STATUS_BODIES[bool(avr.connected)], mimetype='application/json')
+    response.headers['Cache-Control'] = 'max-age=1'
+    return response
 
 @app.route('/api/command/<command_name>', methods=['POST'])
 def send_preset_command(command_name: str) -> Response:
@@ -65,10 +92,33 @@ def send_preset_command(command_name: str) -> Response:
     Returns:
         JSON response with success status and command response
     """
-    if command_name not in AVR_COMMANDS:
+    command = AVR_COMMANDS.get(command_name)
+    if command is None:
         return jsonify({'success': False, 'error': 'Unknown command'})
 
-    command = AVR_COMMANDS[command_name]
+    success, response = avr.send_and_wait(command)
+    return jsonify({
+        'success': success,
+        'command': command,
+        'response': response,
+        'connected': avr.connected
+    })
+
+@app.route('/api/commands', methods=['POST'])
+def send_preset_batch() -> Response:
+    """
+    Send a batch of predefined commands in one receiver exchange.
+
+    Request body should contain: {"commands": ["volume_up", "mute_off", ...]}
+
+    Returns:
+        JSON response with success status and combined command response
+    """
+    data: Dict[str, Any] = request.get_json() or {}
+    command, error_msg = resolve_command_batch(data.get('commands'))
+    if command is None:
+        return jsonify({'success': False, 'error': error_msg})
+
     success, response = avr.send_and_wait(command)
     return jsonify({
         'success': success,
@@ -90,17 +140,9 @@ def send_custom_command() -> Response:
     data: Dict[str, Any] = request.get_json() or {}
     command: str = data.get('command', '')
 
-    if not command:
-        return jsonify({'success': False, 'error': 'No command provided'})
-
-    # Validate and sanitize the custom command
-    is_valid, error_msg = validate_custom_command(command, allow_multiline=True)
-    if not is_valid:
-        logging.warning(f"Invalid custom command rejected: {command} - {error_msg}")
-        return jsonify({'success': False, 'error': f'Invalid command: {error_msg}'})
-
-    # Sanitize the command (though validation should have caught issues)
-    sanitized_command = sanitize_command(command)
+    sanitized_command, error_msg = resolve_custom_command(command)
+    if sanitized_command is None:
+        return jsonify({'success': False, 'error': error_msg})
 
     success, response = avr.send_and_wait(sanitized_command)
     return jsonify({
@@ -114,8 +156,7 @@ def handle_connect() -> None:
     """Handle SocketIO client connection."""
     logging.info("SocketIO client connected")
     emit('status_update', {
-        'connected': avr.connected,
-        'timestamp': time.time()
+        'connected': avr.connected
     })
 
 
@@ -138,19 +179,18 @@ def handle_command(data: Dict[str, Any]) -> None:
         emit('error', {'message': 'No command_name provided'})
         return
 
-    if command_name not in AVR_COMMANDS:
+    command = AVR_COMMANDS.get(command_name)
+    if command is None:
         emit('error', {'message': f'Unknown command: {command_name}'})
         return
 
-    command = AVR_COMMANDS[command_name]
     success, response = avr.send_and_wait(command)
     emit('command_response', {
         'success': success,
         'command_name': command_name,
         'command': command,
         'response': response,
-        'connected': avr.connected,
-        'timestamp': time.time()
+        'connected': avr.connected
     })
 
 
@@ -158,8 +198,7 @@ def handle_command(data: Dict[str, Any]) -> None:
 def handle_status_request() -> None:
     """Handle request for current status."""
     emit('status_update', {
-        'connected': avr.connected,
-        'timestamp': time.time()
+        'connected': avr.connected
     })
 
 if __name__ == '__main__':
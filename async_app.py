@@ -1,15 +1,24 @@
 """
 Async AVRDisco-Web application using Quart.
 """
-from typing import Dict, Any
-from quart import Quart, render_template, request, jsonify, websocket
+from typing import Dict, Any, Optional, Tuple
+from quart import Quart, Response, render_template, request, jsonify, websocket
+from quart.json.provider import DefaultJSONProvider
 import logging
 import asyncio
 import sys
-from config import Config
+from config import Config, configure_logging
+from cached_page import CachedPage, CACHE_CONTROL
 from async_avr_controller import AsyncAVRController, ReceiverState
 from avr_commands import AVR_COMMANDS, COMMAND_GROUPS, COMMAND_LABELS
-from command_validator import validate_custom_command, sanitize_command
+from handlers import resolve_command_batch, resolve_custom_command
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    # orjson not installed, fall back to Quart's stdlib json provider
+    HAS_ORJSON = False
 
 # Initialize config - skip arg parsing if not running as main script
 # When imported by ASGI servers (hypercorn, uvicorn, etc.), we're not __main__
@@ -19,13 +28,24 @@ _is_testing = 'pytest' in sys.modules
 config = Config(parse_args=(_is_main and not _is_testing))
 
 # Setup logging with configurable level
-logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging(config.LOG_LEVEL)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used by jsonify and websocket send_json."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        option = orjson.OPT_INDENT_2 if 'indent' in kwargs else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
 
 # Initialize Quart app
 app = Quart(__name__)
+if HAS_ORJSON:
+    app.json = OrjsonProvider(app)
 
 # CORS configuration - using Quart's native approach
 # Add CORS headers to all responses
@@ -59,16 +79,59 @@ async def handle_options(path):
 # Initialize AVR controller
 avr = AsyncAVRController(config.AVR_HOST, config.AVR_PORT, config.AVR_TIMEOUT, config.DEBUG)
 
-# WebSocket clients for state broadcasting
-websocket_clients = set()
+# Outgoing message queues of connected WebSocket clients, one per connection.
+# Replaced with a new tuple on every connect/disconnect, so a broadcast
+# iterates a stable snapshot without copying.
+websocket_clients: Tuple[asyncio.Queue, ...] = ()
+
+# Messages buffered per client before the oldest ones are dropped
+WEBSOCKET_QUEUE_SIZE = 64
+
+
+def _add_websocket_client(queue: asyncio.Queue) -> None:
+    """Register a WebSocket client queue for state broadcasts."""
+    global websocket_clients
+    websocket_clients = websocket_clients + (queue,)
+
+
+def _remove_websocket_clients(*queues: asyncio.Queue) -> None:
+    """Unregister WebSocket client queues from state broadcasts."""
+    global websocket_clients
+    websocket_clients = tuple(q for q in websocket_clients if q not in queues)
+
+
+def _enqueue_message(queue: asyncio.Queue, message: str) -> None:
+    """Queue a message for one client, dropping its oldest message when full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+# Rendered on first request (url_for needs a request context) and reused,
+# since the command groups and labels never change at runtime
+_index_page: Optional[CachedPage] = None
 
 
 @app.route('/')
 async def index():
-    """Render main web interface."""
-    return await render_template('async_index.html',
-                                command_groups=COMMAND_GROUPS,
-                                command_labels=COMMAND_LABELS)
+    """Serve the pre-rendered main web interface."""
+    global _index_page
+    if _index_page is None:
+        _index_page = CachedPage(await render_template('async_index.html',
+                                                       command_groups=COMMAND_GROUPS,
+                                                       command_labels=COMMAND_LABELS))
+
+    body, etag, encoding = _index_page.select(request.accept_encodings)
+    if request.if_none_match.contains(etag):
+        response = Response('', status=304)
+    else:
+        response = Response(body, mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 
 @app.route('/api/connect', methods=['POST'])
@@ -85,14 +148,57 @@ async def disconnect_avr():
     return jsonify({'success': True, 'connected': avr.connected})
 
 
+# Encoded state dictionary, paired with the object it was built from
+# (get_state_dict returns the same object until the state changes)
+_state_json: Tuple[Optional[Dict[str, Any]], str] = (None, 'null')
+
+# Keep-alive reply, sent as-is (text frame, as the client parses it as JSON)
+PONG_MESSAGE = '{"type":"pong"}'
+
+# Static '{"command":...,' opening of each preset command response
+_COMMAND_PREFIXES: Dict[str, str] = {
+    name: f'{{"command":{app.json.dumps(command)},'
+    for name, command in AVR_COMMANDS.items()
+}
+
+
+def _encoded_state() -> str:
+    """Return the receiver state as JSON, re-encoding only after it changes."""
+    global _state_json
+    state = avr.get_state_dict()
+    if _state_json[0] is not state:
+        _state_json = (state, app.json.dumps(state))
+    return _state_json[1]
+
+
+def _json_bool(value: Any) -> str:
+    return 'true' if value else 'false'
+
+
+def _command_response(prefix: str, success: bool, response: Any) -> Response:
+    """
+    Build a command response body around a pre-encoded opening.
+
+    Args:
+        prefix: Opening of the JSON object, e.g. '{"command":"MV50",'
+        success: Whether the command was sent
+        response: Response lines from the receiver
+
+    Returns:
+        JSON response with success, response, connection and state fields
+    """
+    body = (f'{prefix}"success":{_json_bool(success)},"response":{app.json.dumps(response)},'
+            f'"connected":{_json_bool(avr.connected)},"state":{_encoded_state()}}}')
+    return Response(body, mimetype='application/json')
+
+
 @app.route('/api/status', methods=['GET'])
 async def get_status():
     """Get current connection status and receiver state."""
-    state = await avr.get_state()
-    return jsonify({
-        'connected': avr.connected,
-        'state': state.to_dict()
-    })
+    body = f'{{"connected":{_json_bool(avr.connected)},"state":{_encoded_state()}}}'
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'max-age=1'
+    return response
 
 
 @app.route('/api/command/<command_name>', methods=['POST'])
@@ -106,22 +212,33 @@ async def send_preset_command(command_name: str):
     Returns:
         JSON response with success status and command response
     """
-    if command_name not in AVR_COMMANDS:
+    command = AVR_COMMANDS.get(command_name)
+    if command is None:
         return jsonify({'success': False, 'error': 'Unknown command'})
 
-    command = AVR_COMMANDS[command_name]
     success, response = await avr.send_and_wait(command)
 
-    # Get updated state
-    state = await avr.get_state()
+    return _command_response(_COMMAND_PREFIXES[command_name], success, response)
+
 
-    return jsonify({
-        'success': success,
-        'command': command,
-        'response': response,
-        'connected': avr.connected,
-        'state': state.to_dict()
-    })
+@app.route('/api/commands', methods=['POST'])
+async def send_preset_batch():
+    """
+    Send a batch of predefined commands in one receiver exchange.
+
+    Request body should contain: {"commands": ["volume_up", "mute_off", ...]}
+
+    Returns:
+        JSON response with success status and combined command response
+    """
+    data: Dict[str, Any] = await request.get_json() or {}
+    command, error_msg = resolve_command_batch(data.get('commands'))
+    if command is None:
+        return jsonify({'success': False, 'error': error_msg})
+
+    success, response = await avr.send_and_wait(command)
+
+    return _command_response(f'{{"command":{app.json.dumps(command)},', success, response)
 
 
 @app.route('/api/command', methods=['POST'])
@@ -137,29 +254,25 @@ async def send_custom_command():
     data: Dict[str, Any] = await request.get_json() or {}
     command: str = data.get('command', '')
 
-    if not command:
-        return jsonify({'success': False, 'error': 'No command provided'})
+    sanitized_command, error_msg = resolve_custom_command(command)
+    if sanitized_command is None:
+        return jsonify({'success': False, 'error': error_msg})
 
-    # Validate and sanitize the custom command
-    is_valid, error_msg = validate_custom_command(command, allow_multiline=True)
-    if not is_valid:
-        logging.warning(f"Invalid custom command rejected: {command} - {error_msg}")
-        return jsonify({'success': False, 'error': f'Invalid command: {error_msg}'})
+    success, response = await avr.send_and_wait(sanitized_command)
 
-    # Sanitize the command (though validation should have caught issues)
-    sanitized_command = sanitize_command(command)
+    return _command_response('{', success, response)
 
-    success, response = await avr.send_and_wait(sanitized_command)
 
-    # Get updated state
-    state = await avr.get_state()
+def _state_message() -> str:
+    """Return an encoded state_update message for WebSocket clients."""
+    return (f'{{"type":"state_update","state":{_encoded_state()},'
+            f'"connected":{_json_bool(avr.connected)}}}')
+
 
-    return jsonify({
-        'success': success,
-        'response': response,
-        'connected': avr.connected,
-        'state': state.to_dict()
-    })
+async def _send_queued_messages(client: Any, queue: asyncio.Queue) -> None:
+    """Forward queued messages to a WebSocket client until cancelled."""
+    while True:
+        await client.send(await queue.get())
 
 
 @app.websocket('/ws/state')
@@ -168,37 +281,36 @@ async def websocket_state():
     WebSocket endpoint for real-time state updates.
 
     Sends state updates to connected clients whenever the receiver state changes.
+    Each connection has its own queue drained by a sender task, so a slow
+    client only delays its own updates.
     """
-    # Add this client to the set
-    websocket_clients.add(websocket._get_current_object())
+    queue: asyncio.Queue = asyncio.Queue(maxsize=WEBSOCKET_QUEUE_SIZE)
+    # Send initial state
+    _enqueue_message(queue, _state_message())
+    _add_websocket_client(queue)
+    sender = asyncio.create_task(
+        _send_queued_messages(websocket._get_current_object(), queue))
 
     try:
-        # Send initial state
-        state = await avr.get_state()
-        await websocket.send_json({
-            'type': 'state_update',
-            'state': state.to_dict(),
-            'connected': avr.connected
-        })
-
         # Keep connection alive and handle incoming messages
         while True:
-            message = await websocket.receive_json()
+            message = app.json.loads(await websocket.receive())
 
             # Handle ping/pong for keep-alive
             if message.get('type') == 'ping':
-                await websocket.send_json({'type': 'pong'})
+                _enqueue_message(queue, PONG_MESSAGE)
 
     except asyncio.CancelledError:
         pass
     finally:
-        # Remove client from set
-        websocket_clients.discard(websocket._get_current_object())
+        _remove_websocket_clients(queue)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
 
 
 async def broadcast_state_update(state: ReceiverState):
     """
-    Broadcast state update to all connected WebSocket clients.
+    Queue a state update for all connected WebSocket clients.
 
     Args:
         state: Updated receiver state
@@ -207,25 +319,12 @@ async def broadcast_state_update(state: ReceiverState):
         logging.debug("No WebSocket clients to broadcast to")
         return
 
-    message = {
-        'type': 'state_update',
-        'state': state.to_dict(),
-        'connected': avr.connected
-    }
-
-    logging.debug(f"Broadcasting state to {len(websocket_clients)} clients: volume={state.volume}")
-
-    # Send to all connected clients
-    disconnected = set()
-    for client in websocket_clients:
-        try:
-            await client.send_json(message)
-        except Exception as e:
-            logging.debug(f"Failed to send to client: {e}")
-            disconnected.add(client)
+    logging.debug("Broadcasting state to %s clients: volume=%s", len(websocket_clients), state.volume)
 
-    # Remove disconnected clients
-    websocket_clients.difference_update(disconnected)
+    # Serialize once; each client's sender task delivers it
+    payload = _state_message()
+    for queue in websocket_clients:
+        _enqueue_message(queue, payload)
 
 
 # Register state update callback
@@ -236,7 +335,7 @@ avr.add_state_callback(broadcast_state_update)
 async def startup():
     """Application startup tasks."""
     logging.info("Starting AVRDisco async application")
-    logging.info(f"AV Receiver: {config.AVR_HOST}:{config.AVR_PORT}")
+    logging.info("AV Receiver: %s:%s", config.AVR_HOST, config.AVR_PORT)
     if config.DEBUG:
         logging.info("[DEBUG MODE] Commands will be printed instead of sent to receiver")
 
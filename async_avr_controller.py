@@ -3,25 +3,57 @@ Async AVR controller with state tracking.
 """
 import asyncio
 import logging
+import random
 import re
-from typing import Optional, Tuple, Dict, Any
+import time
+from collections import deque
+from typing import Optional, Tuple, Dict, Any, Callable, Deque, List, Sequence
 from dataclasses import dataclass, field
 from datetime import datetime
 from async_telnet_client import AsyncTelnetClient
-
-# Command separator for multi-line commands
-COMMAND_SEPARATOR = '\n'
+from avr_commands import AVR_COMMAND_SEQUENCES, COMMAND_SEPARATOR, encode_command
 
 # Retry configuration
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 0.5  # seconds
 MAX_RETRY_DELAY = 5.0  # seconds
 
+# Connect timeout for all but the last attempt, so an unreachable receiver
+# fails fast; the last attempt waits the full timeout
+CONNECT_TIMEOUT = 0.5  # seconds
+
+# Cooldown after a failed connect before another attempt is allowed
+CONNECT_COOLDOWN_INITIAL = 0.5  # seconds
+CONNECT_COOLDOWN_MAX = 120.0  # seconds
+
 # State polling interval
 STATE_POLL_INTERVAL = 2.0  # seconds
 
+# Queries sent on each poll (volume, mute, power, input), pre-encoded
+_QUERY_BYTES: Tuple[bytes, ...] = (b'MV?\r', b'MU?\r', b'PW?\r', b'SI?\r')
+_QUERY_PAYLOAD = b''.join(_QUERY_BYTES)
+
+# Responses are matched to pending commands by this many leading characters
+# (e.g. 'MVUP' is answered by 'MV51', 'SIPHONO' by 'SIPHONO')
+RESPONSE_PREFIX_LENGTH = 2
+
+# Lines the receiver sends alongside the actual answer (MVMAX follows every
+# volume report); they update the state but never answer a command
+_UNSOLICITED_PREFIXES = ('MVMAX',)
+
+# Poll replies are matched to waiters of their own, registered in order with
+# those of commands, so a reply like 'MV50' can't complete an MVUP waiter.
+# Waiters the receiver doesn't answer are dropped after POLL_REPLY_TIMEOUT.
+_QUERY_PREFIXES = tuple(query[:RESPONSE_PREFIX_LENGTH].decode('ascii') for query in _QUERY_BYTES)
+POLL_REPLY_TIMEOUT = 1.0  # seconds
+
+
+# ReceiverState fields reported by to_dict() as-is (last_updated is formatted)
+_STATE_DICT_KEYS = ('power', 'volume', 'muted', 'input_source', 'surround_mode',
+                    'zone2_power', 'zone2_volume', 'zone2_muted')
 
-@dataclass
+
+@dataclass(slots=True)
 class ReceiverState:
     """Current state of the AV receiver."""
     power: Optional[bool] = None
@@ -33,20 +65,96 @@ class ReceiverState:
     zone2_volume: Optional[int] = None
     zone2_muted: Optional[bool] = None
     last_updated: datetime = field(default_factory=datetime.now)
+    # last_updated formatted for to_dict(), refreshed by touch()
+    _last_updated_iso: str = field(default='', init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._last_updated_iso = self.last_updated.isoformat()
+
+    def touch(self) -> None:
+        """Set last_updated to now."""
+        self.last_updated = datetime.now()
+        self._last_updated_iso = self.last_updated.isoformat()
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert state to dictionary."""
-        return {
-            'power': self.power,
-            'volume': self.volume,
-            'muted': self.muted,
-            'input_source': self.input_source,
-            'surround_mode': self.surround_mode,
-            'zone2_power': self.zone2_power,
-            'zone2_volume': self.zone2_volume,
-            'zone2_muted': self.zone2_muted,
-            'last_updated': self.last_updated.isoformat()
-        }
+        state = {key: getattr(self, key) for key in _STATE_DICT_KEYS}
+        state['last_updated'] = self._last_updated_iso
+        return state
+
+
+# Responses that set a state field to a fixed value: response -> (field, value)
+_EXACT_RESPONSES: Dict[str, Tuple[str, Any]] = {
+    'PWON': ('power', True),
+    'PWSTANDBY': ('power', False),
+    'MUON': ('muted', True),
+    'MUOFF': ('muted', False),
+    'Z2ON': ('zone2_power', True),
+    'Z2OFF': ('zone2_power', False),
+    'Z2MUON': ('zone2_muted', True),
+    'Z2MUOFF': ('zone2_muted', False),
+}
+
+
+def _parse_two_digit(text: str, offset: int) -> Optional[int]:
+    """
+    Decode two ASCII digits, as used for Denon volume levels.
+
+    Args:
+        text: Response or command string
+        offset: Index of the first digit
+
+    Returns:
+        Value 0-99, or None if the two characters aren't ASCII digits
+    """
+    if len(text) < offset + 2:
+        return None
+    tens = ord(text[offset]) - 48
+    ones = ord(text[offset + 1]) - 48
+    if 0 <= tens <= 9 and 0 <= ones <= 9:
+        return tens * 10 + ones
+    return None
+
+
+def _parse_volume(state: ReceiverState, response: str) -> bool:
+    """Apply a main volume response (format: MV50 = volume 50)."""
+    volume = _parse_two_digit(response, 2)
+    if volume is None:
+        return False
+    state.volume = volume
+    logging.debug("Updated volume from response '%s': %s", response, state.volume)
+    return True
+
+
+def _parse_input_source(state: ReceiverState, response: str) -> bool:
+    """Apply an input source response (format: SICD, SIDVD, etc.)."""
+    state.input_source = response[2:]
+    return True
+
+
+def _parse_surround_mode(state: ReceiverState, response: str) -> bool:
+    """Apply a surround mode response (format: MSSTEREO, MSMOVIE, etc.)."""
+    state.surround_mode = response[2:]
+    return True
+
+
+def _parse_zone2_volume(state: ReceiverState, response: str) -> bool:
+    """Apply a zone 2 volume response (format: Z250 = volume 50)."""
+    volume = _parse_two_digit(response, 2)
+    if volume is None:
+        return False
+    state.zone2_volume = volume
+    return True
+
+
+# Parsers for responses carrying a value, keyed on the two-character prefix.
+# Each returns whether it changed the state.
+_PREFIX_PARSERS: Dict[str, Callable[[ReceiverState, str], bool]] = {
+    'MV': _parse_volume,
+    'SI': _parse_input_source,
+    'MS': _parse_surround_mode,
+    'Z2': _parse_zone2_volume,
+}
 
 
 class AsyncAVRController:
@@ -63,92 +171,147 @@ class AsyncAVRController:
         self.max_retries = max_retries
         self.retry_count = 0
         self.last_error: Optional[str] = None
+        self._connect_lock = asyncio.Lock()
+        self._connect_cooldown = 0.0
+        self._next_connect_time = 0.0
 
         # State tracking
         self.state = ReceiverState()
         self._state_lock = asyncio.Lock()
+        self._state_version = 0
+        self._state_dict: Optional[Dict[str, Any]] = None
+        self._state_dict_version = -1
         self._polling_task: Optional[asyncio.Task] = None
-        self._state_update_callbacks = []
+        # Insertion-ordered registry mapping each callback to whether it is a
+        # coroutine function; keyed on the callback itself rather than id()
+        # since bound methods are recreated on every attribute access
+        self._state_update_callbacks: Dict[Callable, bool] = {}
+
+        # Response demultiplexing
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[Tuple[str, asyncio.Future]] = deque()
 
     def add_state_callback(self, callback):
         """Add callback to be called when state updates."""
-        self._state_update_callbacks.append(callback)
+        self._state_update_callbacks[callback] = asyncio.iscoroutinefunction(callback)
 
     def remove_state_callback(self, callback):
         """Remove state update callback."""
-        if callback in self._state_update_callbacks:
-            self._state_update_callbacks.remove(callback)
+        self._state_update_callbacks.pop(callback, None)
 
     async def _notify_state_update(self):
         """Notify all callbacks of state update."""
-        for callback in self._state_update_callbacks:
+        # Iterate a snapshot so callbacks may add or remove callbacks
+        coroutines = []
+        for callback, is_coroutine in tuple(self._state_update_callbacks.items()):
             try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(self.state)
+                if is_coroutine:
+                    coroutines.append(callback(self.state))
                 else:
                     callback(self.state)
             except Exception as e:
-                logging.error(f"Error in state update callback: {e}")
+                logging.error("Error in state update callback: %s", e)
+
+        # Async callbacks run concurrently, so notification takes as long as
+        # the slowest one rather than the sum of all of them
+        if coroutines:
+            results = await asyncio.gather(*coroutines, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logging.error("Error in state update callback: %s", result)
 
     async def connect(self, retry: bool = True) -> bool:
         """
         Connect to the AV receiver with optional retry logic.
 
+        Concurrent callers share a single in-flight attempt. After a failed
+        connect, further attempts are refused until a cooldown expires; the
+        cooldown doubles on each consecutive failure up to CONNECT_COOLDOWN_MAX.
+
         Args:
             retry: Whether to retry on failure with exponential backoff
 
         Returns:
             True if connection successful, False otherwise
         """
+        if self._connect_lock.locked():
+            # Another caller is already connecting, wait for its outcome
+            async with self._connect_lock:
+                return self.connected
+
+        async with self._connect_lock:
+            return await self._connect(retry)
+
+    async def _connect(self, retry: bool) -> bool:
+        """Perform the connection attempts for connect()."""
         if self.debug_mode:
             self.connected = True
             self.retry_count = 0
             print(f"[DEBUG] Simulating connection to AVR at {self.host}:{self.port}")
-            # Start polling in debug mode
-            await self._start_polling()
+            # No polling in debug mode, the simulated state only changes
+            # when commands are sent
             return True
 
+        if time.monotonic() < self._next_connect_time:
+            logging.debug("Skipping connect to AVR, cooling down after: %s", self.last_error)
+            return False
+
         attempts = 0
-        delay = INITIAL_RETRY_DELAY
 
-        while attempts <= (self.max_retries if retry else 0):
+        last_attempt = self.max_retries if retry else 0
+
+        while attempts <= last_attempt:
+            connect_timeout = None if attempts == last_attempt else min(CONNECT_TIMEOUT, self.timeout)
             try:
                 if self.connection:
                     await self.disconnect()
 
-                self.connection = AsyncTelnetClient(self.host, self.port, self.timeout)
-                await self.connection.open()
+                connection = AsyncTelnetClient(self.host, self.port, self.timeout)
+                self.connection = connection
+                await connection.open(connect_timeout)
                 self.connected = True
                 self.retry_count = 0
                 self.last_error = None
-                logging.info(f"Connected to AVR at {self.host}:{self.port}")
+                self._connect_cooldown = 0.0
+                self._next_connect_time = 0.0
+                logging.info("Connected to AVR at %s:%s", self.host, self.port)
 
-                # Start state polling
-                await self._start_polling()
+                # Start dispatching responses to pending commands
+                await self._start_reader(connection)
 
-                # Request initial state
-                await self._request_initial_state()
+                # Start state polling. Its first tick requests the initial
+                # state, so connect() returns without waiting on the queries
+                # and the reader task applies the responses as they arrive.
+                await self._stop_polling()
+                await self._start_polling()
 
                 return True
             except Exception as e:
                 self.last_error = str(e)
                 attempts += 1
-                logging.error(f"Failed to connect to AVR (attempt {attempts}/{self.max_retries + 1}): {e}")
+                logging.error("Failed to connect to AVR (attempt %s/%s): %s", attempts, self.max_retries + 1, e)
                 self.connected = False
                 self.connection = None
 
                 if retry and attempts <= self.max_retries:
-                    logging.info(f"Retrying in {delay:.1f} seconds...")
+                    # Full jitter: pick anywhere up to the exponential cap so
+                    # clients recovering from the same outage don't retry in step
+                    cap = min(MAX_RETRY_DELAY, INITIAL_RETRY_DELAY * 2 ** (attempts - 1))
+                    delay = random.uniform(0, cap)
+                    logging.info("Retrying in %.1f seconds...", delay)
                     await asyncio.sleep(delay)
-                    delay = min(delay * 2, MAX_RETRY_DELAY)
 
         self.retry_count = attempts
+        self._connect_cooldown = min(max(self._connect_cooldown * 2, CONNECT_COOLDOWN_INITIAL),
+                                     CONNECT_COOLDOWN_MAX)
+        self._next_connect_time = time.monotonic() + self._connect_cooldown
         return False
 
     async def disconnect(self) -> None:
         """Disconnect from the AV receiver."""
-        # Stop polling
+        # Stop polling and response dispatch
         await self._stop_polling()
+        await self._stop_reader()
 
         if self.debug_mode:
             self.connected = False
@@ -162,7 +325,7 @@ class AsyncAVRController:
             self.connected = False
             logging.info("Disconnected from AVR")
         except Exception as e:
-            logging.error(f"Error disconnecting: {e}")
+            logging.error("Error disconnecting: %s", e)
             self.connected = False
             self.connection = None
 
@@ -174,6 +337,23 @@ class AsyncAVRController:
             command: Command string to send
             retry_on_failure: Whether to retry connection if sending fails
 
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        return await self._send_commands((command,), retry_on_failure)
+
+    async def _send_commands(self, commands: Sequence[str], retry_on_failure: bool = True,
+                             waiters: Optional[List[Tuple[str, asyncio.Future]]] = None) -> Tuple[bool, str]:
+        """
+        Send commands to the AV receiver in a single write, with optional retry.
+
+        Args:
+            commands: Individual command strings, without separators
+            retry_on_failure: Whether to retry connection if sending fails
+            waiters: If given, filled with a response waiter per command,
+                registered just before each write. Reconnecting releases all
+                pending waiters, so a resend registers them again.
+
         Returns:
             Tuple of (success: bool, message: str)
         """
@@ -183,40 +363,55 @@ class AsyncAVRController:
                 return False, error_msg
 
         if self.debug_mode:
-            print(f"[DEBUG] Would send command: {command}")
-            # Simulate state changes in debug mode
-            await self._simulate_state_change(command)
+            for command in commands:
+                print(f"[DEBUG] Would send command: {command}")
+                # Simulate state changes in debug mode
+                await self._simulate_state_change(command)
             return True, "Debug mode - command printed"
 
-        try:
-            if not self.connection:
-                return False, "Connection lost"
-            command_bytes = (command + '\r').encode('ascii')
-            await self.connection.write(command_bytes)
-            logging.info(f"Sent command: {command}")
-
-            # Try to read response for state update
-            await self._try_read_response(command)
-
-            return True, "Command sent"
-        except Exception as e:
-            error_msg = str(e)
-            logging.error(f"Failed to send command '{command}': {error_msg}")
-            self.connected = False
-            self.connection = None
-            self.last_error = error_msg
+        payload = None
+        # First attempt, plus one resend after reconnecting if retry is enabled
+        for attempt in range(2):
+            try:
+                if not self.connection:
+                    return False, "Connection lost"
+                if payload is None:
+                    payload = b''.join(encode_command(command) for command in commands)
+                if waiters is not None:
+                    for waiter in waiters:
+                        self._forget_response(waiter)
+                    waiters[:] = [self._expect_response(command[:RESPONSE_PREFIX_LENGTH])
+                                  for command in commands]
+                await self.connection.write(payload)
+                for command in commands:
+                    logging.info("Sent command: %s", command)
+                return True, "Command sent"
+            except OSError as e:
+                # Socket failure: the connection can't be trusted any more
+                error_msg = str(e)
+                logging.error("Failed to send command '%s': %s", COMMAND_SEPARATOR.join(commands), error_msg)
+                self.connected = False
+                self.connection = None
+                self.last_error = error_msg
 
-            # Try to reconnect and resend if retry is enabled
-            if retry_on_failure and self.retry_count < self.max_retries:
+                # Try to reconnect and resend if retry is enabled
+                if attempt > 0 or not retry_on_failure or self.retry_count >= self.max_retries:
+                    return False, error_msg
                 logging.info("Attempting to reconnect and resend command...")
-                if await self.connect(retry=True):
-                    return await self.send_command(command, retry_on_failure=False)
+                if not await self.connect(retry=True):
+                    return False, error_msg
+            except Exception as e:
+                # Anything else is a problem with the commands themselves and
+                # leaves the connection usable
+                error_msg = str(e)
+                logging.error("Failed to send command '%s': %s", COMMAND_SEPARATOR.join(commands), error_msg)
+                return False, error_msg
 
-            return False, error_msg
+        return False, self.last_error or "Connection lost"
 
-    async def read_response(self, timeout: int = 2) -> Optional[str]:
+    async def read_response(self, timeout: float = 2) -> Optional[str]:
         """
-        Read response from AV receiver.
+        Wait for the next response from the AV receiver.
 
         Args:
             timeout: Read timeout in seconds
@@ -230,224 +425,214 @@ class AsyncAVRController:
         if self.debug_mode:
             return "DEBUG: Simulated response"
 
+        waiter = self._expect_response('')
         try:
-            if not self.connection:
-                return None
-            response = await self.connection.read_until(b'\r', timeout)
-            if response:
-                decoded = response.decode('ascii').strip()
-                logging.info(f"Received response: {decoded}")
-                # Update state based on response
-                await self._update_state_from_response(decoded)
-                return decoded
+            return await asyncio.wait_for(waiter[1], timeout)
         except asyncio.TimeoutError:
             # Timeout is expected when there's no response
-            pass
-        except Exception as e:
-            logging.error(f"Failed to read response: {e}")
-            self.connected = False
-            self.connection = None
-        return None
+            return None
+        finally:
+            self._forget_response(waiter)
 
     async def send_and_wait(self, command: str, wait_time: float = 0.5) -> Tuple[bool, str]:
         """
         Send command and wait for response - handles multi-line commands.
 
+        All commands are sent in a single write, each with a waiter registered
+        under its response prefix, and the reader task resolves the waiters
+        as responses arrive. A sequence therefore costs about one round trip
+        instead of one per command.
+
         Args:
             command: Command string (can contain multiple commands separated by COMMAND_SEPARATOR)
-            wait_time: Time to wait between commands in seconds
+            wait_time: Maximum time to wait for responses in seconds
 
         Returns:
             Tuple of (success: bool, response: str)
         """
         # Handle multi-line commands (separated by COMMAND_SEPARATOR)
-        commands = command.split(COMMAND_SEPARATOR)
-        responses = []
-
-        for cmd in commands:
-            cmd = cmd.strip()
-            if not cmd:
-                continue
+        commands: Sequence[str] = AVR_COMMAND_SEQUENCES.get(command) or tuple(
+            cmd.strip() for cmd in command.split(COMMAND_SEPARATOR) if cmd.strip())
 
-            success, message = await self.send_command(cmd)
+        waiters: List[Tuple[str, asyncio.Future]] = []
+        try:
+            success, message = await self._send_commands(commands, waiters=waiters)
             if not success:
                 return success, message
 
-            await asyncio.sleep(wait_time)
-            response = await self.read_response()
-            if response:
-                responses.append(response)
+            if self.debug_mode:
+                responses = ["DEBUG: Simulated response"] * len(commands)
+            else:
+                responses = []
+                if waiters:
+                    await asyncio.wait([future for _, future in waiters], timeout=wait_time)
+                for _, future in waiters:
+                    if future.done() and not future.cancelled() and future.result():
+                        responses.append(future.result())
+        finally:
+            for waiter in waiters:
+                self._forget_response(waiter)
 
         return True, '; '.join(responses) if responses else "Commands sent"
 
-    async def _try_read_response(self, command: str, timeout: float = 1.0):
-        """Try to read response after sending command."""
+    def _expect_response(self, prefix: str) -> Tuple[str, asyncio.Future]:
+        """Register a waiter for the next response starting with prefix."""
+        waiter = (prefix, asyncio.get_running_loop().create_future())
+        self._pending.append(waiter)
+        return waiter
+
+    def _forget_response(self, waiter: Tuple[str, asyncio.Future]) -> None:
+        """Drop a waiter that is no longer needed."""
+        if not waiter[1].done():
+            waiter[1].cancel()
         try:
-            response = await self.read_response(timeout)
-            if response:
-                logging.debug(f"Read response for '{command}': {response}")
-                await self._update_state_from_response(response)
-            else:
-                logging.debug(f"No response received for '{command}'")
-        except Exception as e:
-            logging.debug(f"Error reading response for '{command}': {e}")
-            pass  # Ignore errors reading response
+            self._pending.remove(waiter)
+        except ValueError:
+            pass
 
-    async def _update_state_from_response(self, response: str):
-        """Update state from receiver response."""
-        async with self._state_lock:
-            updated = False
+    def _forget_responses(self, waiters: Sequence[Tuple[str, asyncio.Future]]) -> None:
+        """Drop several waiters that are no longer needed."""
+        for waiter in waiters:
+            self._forget_response(waiter)
 
-            # Power state
-            if response == 'PWON':
-                self.state.power = True
-                updated = True
-            elif response == 'PWSTANDBY':
-                self.state.power = False
-                updated = True
+    def _dispatch_response(self, response: str) -> None:
+        """Resolve the oldest pending waiter whose prefix matches response."""
+        if response.startswith(_UNSOLICITED_PREFIXES):
+            return
+        for waiter in self._pending:
+            prefix, future = waiter
+            if not future.done() and response.startswith(prefix):
+                self._pending.remove(waiter)
+                future.set_result(response)
+                return
 
-            # Volume (format: MV50 = volume 50)
-            if response.startswith('MV') and len(response) >= 3:
-                try:
-                    vol_str = response[2:4]
-                    if vol_str.isdigit():
-                        self.state.volume = int(vol_str)
-                        updated = True
-                        logging.debug(f"Updated volume from response '{response}': {self.state.volume}")
-                except (ValueError, IndexError):
-                    pass
-
-            # Mute
-            if response == 'MUON':
-                self.state.muted = True
-                updated = True
-            elif response == 'MUOFF':
-                self.state.muted = False
-                updated = True
+    def _drop_pending(self) -> None:
+        """Release all pending waiters without a response."""
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_result(None)
+
+    async def _reader_loop(self, connection: AsyncTelnetClient):
+        """Read responses as they arrive and dispatch them to waiters and state."""
+        logging.debug("Response reader started")
+        while self.connection is connection:
+            try:
+                frames = await connection.read_batch(b'\r')
+            except asyncio.TimeoutError:
+                # Receiver is idle, keep listening
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_msg = str(e)
+                logging.error("Failed to read response: %s", error_msg)
+                if self.connection is connection:
+                    self.connected = False
+                    self.connection = None
+                    self.last_error = error_msg
+                self._drop_pending()
+                await connection.close()
+                return
 
-            # Input source (format: SICD, SIDVD, etc.)
-            if response.startswith('SI'):
-                self.state.input_source = response[2:]
-                updated = True
+            for frame in frames:
+                decoded = frame.decode('ascii', errors='replace').strip()
+                if not decoded:
+                    continue
+                logging.info("Received response: %s", decoded)
+                self._dispatch_response(decoded)
+                await self._update_state_from_response(decoded)
 
-            # Surround mode (format: MSSTEREO, MSMOVIE, etc.)
-            if response.startswith('MS'):
-                self.state.surround_mode = response[2:]
-                updated = True
+    async def _start_reader(self, connection: AsyncTelnetClient):
+        """Start the response reader for a new connection."""
+        await self._stop_reader()
+        self._reader_task = asyncio.create_task(self._reader_loop(connection))
 
-            # Zone 2 power
-            if response == 'Z2ON':
-                self.state.zone2_power = True
-                updated = True
-            elif response == 'Z2OFF':
-                self.state.zone2_power = False
-                updated = True
+    async def _stop_reader(self):
+        """Stop the response reader and release pending waiters."""
+        if self._reader_task and not self._reader_task.done():
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+        self._reader_task = None
+        self._drop_pending()
 
-            # Zone 2 volume
-            if response.startswith('Z2') and len(response) >= 3:
-                try:
-                    vol_str = response[2:4]
-                    if vol_str.isdigit():
-                        self.state.zone2_volume = int(vol_str)
-                        updated = True
-                except (ValueError, IndexError):
-                    pass
-
-            # Zone 2 mute
-            if response == 'Z2MUON':
-                self.state.zone2_muted = True
-                updated = True
-            elif response == 'Z2MUOFF':
-                self.state.zone2_muted = False
-                updated = True
+    async def _update_state_from_response(self, response: str):
+        """Update state from receiver response."""
+        async with self._state_lock:
+            updated = self._apply_response(response)
 
-            if updated:
-                self.state.last_updated = datetime.now()
-                logging.debug(f"State updated, notifying {len(self._state_update_callbacks)} callbacks")
-                await self._notify_state_update()
+        # Callbacks run outside the lock so a slow subscriber doesn't hold up
+        # parsing of the next response
+        if updated:
+            logging.debug("State updated, notifying %s callbacks", len(self._state_update_callbacks))
+            await self._notify_state_update()
 
     async def _simulate_state_change(self, command: str):
         """Simulate state changes in debug mode."""
         async with self._state_lock:
-            if command == 'PWON':
-                self.state.power = True
-            elif command == 'PWSTANDBY':
-                self.state.power = False
-            elif command == 'MVUP':
-                self.state.volume = min(98, (self.state.volume or 50) + 1)
-            elif command == 'MVDOWN':
-                self.state.volume = max(0, (self.state.volume or 50) - 1)
-            elif command.startswith('MV') and len(command) >= 3:
-                # Volume set command (e.g., MV67)
-                try:
-                    vol = int(command[2:4])
-                    self.state.volume = vol
-                except (ValueError, IndexError):
-                    pass
-            elif command == 'MUON':
-                self.state.muted = True
-            elif command == 'MUOFF':
-                self.state.muted = False
-            elif command.startswith('SI'):
-                self.state.input_source = command[2:]
-            elif command.startswith('MS'):
-                self.state.surround_mode = command[2:]
-            elif command.startswith('Z2') and len(command) >= 3:
-                # Zone 2 commands
-                if command == 'Z2MUON':
-                    self.state.zone2_muted = True
-                elif command == 'Z2MUOFF':
-                    self.state.zone2_muted = False
-                else:
-                    # Zone 2 volume (e.g., Z267)
-                    try:
-                        vol = int(command[2:4])
-                        self.state.zone2_volume = vol
-                    except (ValueError, IndexError):
-                        pass
-
-            self.state.last_updated = datetime.now()
+            # Relative volume steps need the current level; every other
+            # command is echoed by the receiver as the matching response
+            if command in ('MVUP', 'MVDOWN'):
+                step = 1 if command == 'MVUP' else -1
+                self.state.volume = min(98, max(0, (self.state.volume or 50) + step))
+                self._mark_updated()
+                updated = True
+            else:
+                updated = self._apply_response(command)
+
+        if updated:
             await self._notify_state_update()
 
+    def _apply_response(self, response: str) -> bool:
+        """
+        Apply a receiver response to the state. Caller must hold the state lock.
+
+        Args:
+            response: Response line without the trailing CR
+
+        Returns:
+            True if the response changed the state
+        """
+        exact = _EXACT_RESPONSES.get(response)
+        if exact is not None:
+            setattr(self.state, *exact)
+            updated = True
+        else:
+            parser = _PREFIX_PARSERS.get(response[:2])
+            updated = parser is not None and parser(self.state, response)
+
+        if updated:
+            self._mark_updated()
+        return updated
+
+    def _mark_updated(self) -> None:
+        """Stamp the state once per applied response and invalidate the cached dict."""
+        self.state.touch()
+        self._state_version += 1
+
     async def _request_initial_state(self):
         """Request initial state from receiver."""
         if not self.connected or self.debug_mode:
             return
 
-        # Request current status (queries that return state)
-        queries = ['MV?', 'MU?', 'PW?', 'SI?']
-
+        # Request current status (queries that return state). The responses
+        # are picked up by the reader task and applied to the state.
         try:
             if not self.connection:
                 return
 
-            # Send all queries quickly
-            for query in queries:
-                command_bytes = (query + '\r').encode('ascii')
-                await self.connection.write(command_bytes)
-                logging.debug(f"Sent query: {query}")
-                await asyncio.sleep(0.05)  # Small delay between queries
-
-            # Now read all responses for a period of time
-            # The receiver will send back multiple responses
-            read_deadline = asyncio.get_event_loop().time() + 1.0  # Read for up to 1 second
-
-            while asyncio.get_event_loop().time() < read_deadline:
-                try:
-                    response = await self.connection.read_until(b'\r', timeout=0.2)
-                    if response:
-                        decoded = response.decode('ascii').strip()
-                        logging.debug(f"Poll response: {decoded}")
-                        await self._update_state_from_response(decoded)
-                except asyncio.TimeoutError:
-                    # No more responses, we're done
-                    break
-                except Exception as e:
-                    logging.debug(f"Error reading poll response: {e}")
-                    break
+            # All queries go out in one write; the responses stream back
+            # to the reader task in order
+            waiters = [self._expect_response(prefix) for prefix in _QUERY_PREFIXES]
+            asyncio.get_running_loop().call_later(POLL_REPLY_TIMEOUT, self._forget_responses, waiters)
+            await self.connection.write(_QUERY_PAYLOAD)
+            logging.debug("Sent queries: %r", _QUERY_PAYLOAD)
 
         except Exception as e:
-            logging.debug(f"Error in state polling: {e}")
+            logging.debug("Error in state polling: %s", e)
             pass  # Ignore errors during state query
 
     async def _poll_state(self):
@@ -455,18 +640,21 @@ class AsyncAVRController:
         logging.debug("State polling started")
         while self.connected:
             try:
-                logging.debug("Polling receiver state...")
-                await self._request_initial_state()
+                if self.connection is not None:
+                    logging.debug("Polling receiver state...")
+                    await self._request_initial_state()
                 await asyncio.sleep(STATE_POLL_INTERVAL)
             except asyncio.CancelledError:
                 logging.debug("State polling cancelled")
                 break
             except Exception as e:
-                logging.error(f"Error polling state: {e}")
+                logging.error("Error polling state: %s", e)
                 await asyncio.sleep(STATE_POLL_INTERVAL)
 
     async def _start_polling(self):
         """Start state polling task."""
+        if self.debug_mode:
+            return
         if self._polling_task is None or self._polling_task.done():
             self._polling_task = asyncio.create_task(self._poll_state())
 
@@ -484,3 +672,18 @@ class AsyncAVRController:
         """Get current receiver state."""
         async with self._state_lock:
             return self.state
+
+    def get_state_dict(self) -> Dict[str, Any]:
+        """
+        Get current receiver state as a dictionary.
+
+        The dictionary is rebuilt only after the state changes and is shared
+        between callers until then, so it must not be modified.
+
+        Returns:
+            Cached result of ReceiverState.to_dict()
+        """
+        if self._state_dict is None or self._state_dict_version != self._state_version:
+            self._state_dict = self.state.to_dict()
+            self._state_dict_version = self._state_version
+        return self._state_dict
@@ -2,7 +2,13 @@
 Async telnet client implementation using asyncio.
 """
 import asyncio
-from typing import Optional
+from typing import List, Optional
+
+
+# Bytes requested per read by read_batch, and the longest partial frame it
+# buffers before handing it over without a delimiter
+READ_BATCH_SIZE = 4096
+MAX_FRAME_SIZE = 8192
 
 
 class AsyncTelnetClient:
@@ -22,31 +28,47 @@ class AsyncTelnetClient:
         self.timeout = timeout
         self.reader: Optional[asyncio.StreamReader] = None
         self.writer: Optional[asyncio.StreamWriter] = None
+        # Guards opening and closing only. Reads and writes run on the event
+        # loop without locking: StreamWriter.write() is synchronous and the
+        # controller has a single reader task, so a pending read never holds
+        # up an outgoing command.
         self._lock = asyncio.Lock()
+        # Partial frame left over from the last read_batch
+        self._rx_tail = b''
 
-    async def open(self) -> None:
-        """Open connection to remote host."""
+    async def open(self, connect_timeout: Optional[float] = None) -> None:
+        """
+        Open connection to remote host.
+
+        Args:
+            connect_timeout: Optional limit for establishing the connection
+                instead of the client timeout
+        """
         async with self._lock:
-            if self.writer:
-                await self.close()
+            await self._close_stream()
 
             self.reader, self.writer = await asyncio.wait_for(
                 asyncio.open_connection(self.host, self.port),
-                timeout=self.timeout
+                timeout=self.timeout if connect_timeout is None else connect_timeout
             )
 
     async def close(self) -> None:
         """Close the connection."""
         async with self._lock:
-            if self.writer:
-                try:
-                    self.writer.close()
-                    await self.writer.wait_closed()
-                except Exception:
-                    pass
-                finally:
-                    self.writer = None
-                    self.reader = None
+            await self._close_stream()
+
+    async def _close_stream(self) -> None:
+        """Close the current stream, if any. Caller must hold the lock."""
+        writer = self.writer
+        self.writer = None
+        self.reader = None
+        self._rx_tail = b''
+        if writer:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
 
     async def write(self, data: bytes) -> None:
         """
@@ -58,11 +80,11 @@ class AsyncTelnetClient:
         Raises:
             ConnectionError: If not connected or send fails
         """
-        async with self._lock:
-            if not self.writer:
-                raise ConnectionError("Not connected")
-            self.writer.write(data)
-            await self.writer.drain()
+        writer = self.writer
+        if not writer:
+            raise ConnectionError("Not connected")
+        writer.write(data)
+        await writer.drain()
 
     async def read_until(self, delimiter: bytes, timeout: Optional[float] = None) -> bytes:
         """
@@ -79,25 +101,25 @@ class AsyncTelnetClient:
             ConnectionError: If not connected
             asyncio.TimeoutError: If timeout occurs
         """
-        async with self._lock:
-            if not self.reader:
-                raise ConnectionError("Not connected")
+        reader = self.reader
+        if not reader:
+            raise ConnectionError("Not connected")
 
-            read_timeout = timeout if timeout is not None else self.timeout
+        read_timeout = timeout if timeout is not None else self.timeout
 
-            try:
-                data = await asyncio.wait_for(
-                    self.reader.readuntil(delimiter),
-                    timeout=read_timeout
-                )
-                return data
-            except asyncio.LimitOverrunError:
-                # Delimiter not found within limit, read what we can
-                data = await asyncio.wait_for(
-                    self.reader.read(8192),
-                    timeout=read_timeout
-                )
-                return data
+        try:
+            data = await asyncio.wait_for(
+                reader.readuntil(delimiter),
+                timeout=read_timeout
+            )
+            return data
+        except asyncio.LimitOverrunError:
+            # Delimiter not found within limit, read what we can
+            data = await asyncio.wait_for(
+                reader.read(8192),
+                timeout=read_timeout
+            )
+            return data
 
     async def readline(self, timeout: Optional[float] = None) -> bytes:
         """
@@ -113,14 +135,51 @@ class AsyncTelnetClient:
             ConnectionError: If not connected
             asyncio.TimeoutError: If timeout occurs
         """
-        async with self._lock:
-            if not self.reader:
-                raise ConnectionError("Not connected")
+        reader = self.reader
+        if not reader:
+            raise ConnectionError("Not connected")
 
-            read_timeout = timeout if timeout is not None else self.timeout
+        read_timeout = timeout if timeout is not None else self.timeout
 
-            data = await asyncio.wait_for(
-                self.reader.readline(),
-                timeout=read_timeout
-            )
-            return data
+        data = await asyncio.wait_for(
+            reader.readline(),
+            timeout=read_timeout
+        )
+        return data
+
+    async def read_batch(self, delimiter: bytes = b'\r',
+                         timeout: Optional[float] = None) -> List[bytes]:
+        """
+        Read whatever has arrived and split it into delimited frames.
+
+        Responses that arrive together (e.g. the replies to a burst of
+        queries) are returned from a single read. An incomplete trailing
+        frame is kept and completed by the next call.
+
+        Args:
+            delimiter: Byte sequence separating frames
+            timeout: Optional timeout override
+
+        Returns:
+            Complete frames without the delimiter (may be empty)
+
+        Raises:
+            ConnectionError: If not connected or the connection was closed
+            asyncio.TimeoutError: If no data arrives before the timeout
+        """
+        reader = self.reader
+        if not reader:
+            raise ConnectionError("Not connected")
+
+        read_timeout = timeout if timeout is not None else self.timeout
+
+        data = await asyncio.wait_for(reader.read(READ_BATCH_SIZE), timeout=read_timeout)
+        if not data:
+            raise ConnectionError("Connection closed by receiver")
+
+        *frames, self._rx_tail = (self._rx_tail + data).split(delimiter)
+        if len(self._rx_tail) > MAX_FRAME_SIZE:
+            # No delimiter within a sane frame length, hand over what we have
+            frames.append(self._rx_tail)
+            self._rx_tail = b''
+        return frames
@@ -3,7 +3,14 @@ AVR Command mappings and UI configuration.
 Adjust these for your specific receiver model.
 These are common Denon/Marantz commands, modify as needed.
 """
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Maximum number of commands accepted in a single /api/commands batch
+MAX_COMMAND_BATCH = 128
+
+# Command separator for multi-line commands
+COMMAND_SEPARATOR = '\n'
 
 AVR_COMMANDS: Dict[str, str] = {
     # Presets / Scenes
@@ -60,6 +67,13 @@ AVR_COMMANDS: Dict[str, str] = {
     'surround_auto': 'MSAUTO'
 }
 
+# Each command string above split into its individual commands, keyed on the
+# command string itself so the controllers can skip splitting presets
+AVR_COMMAND_SEQUENCES: Dict[str, Tuple[str, ...]] = {
+    command: tuple(line.strip() for line in command.split(COMMAND_SEPARATOR) if line.strip())
+    for command in AVR_COMMANDS.values()
+}
+
 # UI groupings for better organization
 COMMAND_GROUPS: Dict[str, List[str]] = {
     'presets': ['preset_vinyl'],
@@ -112,4 +126,19 @@ COMMAND_LABELS: Dict[str, str] = {
     'surround_movie': 'Movie',
     'surround_music': 'Music',
     'surround_auto': 'Auto'
-}
\ No newline at end of file
+}
+
+
+@lru_cache(maxsize=512)
+def encode_command(command: str) -> bytes:
+    """
+    Encode a single command for the wire, cached since the same few commands
+    are sent over and over.
+
+    Args:
+        command: Command string without separators, e.g. 'MVUP'
+
+    Returns:
+        ASCII bytes terminated with a carriage return
+    """
+    return (command + '\r').encode('ascii')
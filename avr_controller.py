@@ -1,17 +1,24 @@
 import threading
 import time
 import logging
-from typing import Optional, Tuple
+import socket
+from typing import List, Optional, Sequence, Tuple
 from telnet_client import TelnetClient
-
-# Command separator for multi-line commands
-COMMAND_SEPARATOR = '\n'
+from avr_commands import AVR_COMMAND_SEQUENCES, COMMAND_SEPARATOR, encode_command
 
 # Retry configuration
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 0.5  # seconds
 MAX_RETRY_DELAY = 5.0  # seconds
 
+# Connect timeout for all but the last attempt, so an unreachable receiver
+# fails fast; the last attempt waits the full timeout
+CONNECT_TIMEOUT = 0.5  # seconds
+
+# Cooldown after a failed connect before another attempt is allowed
+CONNECT_COOLDOWN_INITIAL = 0.5  # seconds
+CONNECT_COOLDOWN_MAX = 120.0  # seconds
+
 
 class AVRController:
     def __init__(self, host: str, port: int, timeout: int = 5, debug_mode: bool = False,
@@ -26,11 +33,27 @@ class AVRController:
         self.max_retries = max_retries
         self.retry_count = 0
         self.last_error: Optional[str] = None
-        
+        self._connect_cooldown = 0.0
+        self._next_connect_time = 0.0
+        # Held for the whole of a connect attempt, retries included
+        self._connect_lock = threading.Lock()
+        # Held for a whole send_and_wait so concurrent requests can't read
+        # each other's responses off the shared stream
+        self._exchange_lock = threading.Lock()
+
     def connect(self, retry: bool = True) -> bool:
         """
         Connect to the AV receiver with optional retry logic.
 
+        After a failed connect, further attempts are refused until a cooldown
+        expires. The cooldown doubles on each consecutive failure up to
+        CONNECT_COOLDOWN_MAX, so callers hammering a power-cycling receiver
+        get the cached failure instead of a new round of TCP connects.
+
+        Requests arriving while another thread is connecting wait for that
+        attempt and share its outcome instead of opening a second connection,
+        since receivers usually accept only one telnet client at a time.
+
         Args:
             retry: Whether to retry on failure with exponential backoff
 
@@ -43,35 +66,60 @@ class AVRController:
             print(f"[DEBUG] Simulating connection to AVR at {self.host}:{self.port}")
             return True
 
+        if not self._connect_lock.acquire(blocking=False):
+            with self._connect_lock:
+                return self.connected
+        try:
+            return self._connect(retry)
+        finally:
+            self._connect_lock.release()
+
+    def _connect(self, retry: bool) -> bool:
+        """Perform the connection attempts for connect()."""
+        if time.monotonic() < self._next_connect_time:
+            logging.debug("Skipping connect to AVR, cooling down after: %s", self.last_error)
+            return False
+
         attempts = 0
         delay = INITIAL_RETRY_DELAY
 
-        while attempts <= (self.max_retries if retry else 0):
+        last_attempt = self.max_retries if retry else 0
+
+        while attempts <= last_attempt:
+            connect_timeout = None if attempts == last_attempt else min(CONNECT_TIMEOUT, self.timeout)
             try:
                 with self.lock:
+                    # Close any previous connection directly; disconnect()
+                    # takes self.lock, which is already held here
                     if self.connection:
-                        self.disconnect()
+                        self.connection.close()
+                        self.connection = None
 
                     self.connection = TelnetClient(self.host, self.port, self.timeout)
-                    self.connection.open()
+                    self.connection.open(connect_timeout)
                     self.connected = True
                     self.retry_count = 0
                     self.last_error = None
-                    logging.info(f"Connected to AVR at {self.host}:{self.port}")
+                    self._connect_cooldown = 0.0
+                    self._next_connect_time = 0.0
+                    logging.info("Connected to AVR at %s:%s", self.host, self.port)
                     return True
             except Exception as e:
                 self.last_error = str(e)
                 attempts += 1
-                logging.error(f"Failed to connect to AVR (attempt {attempts}/{self.max_retries + 1}): {e}")
+                logging.error("Failed to connect to AVR (attempt %s/%s): %s", attempts, self.max_retries + 1, e)
                 self.connected = False
                 self.connection = None
 
                 if retry and attempts <= self.max_retries:
-                    logging.info(f"Retrying in {delay:.1f} seconds...")
+                    logging.info("Retrying in %.1f seconds...", delay)
                     time.sleep(delay)
                     delay = min(delay * 2, MAX_RETRY_DELAY)  # Exponential backoff
 
         self.retry_count = attempts
+        self._connect_cooldown = min(max(self._connect_cooldown * 2, CONNECT_COOLDOWN_INITIAL),
+                                     CONNECT_COOLDOWN_MAX)
+        self._next_connect_time = time.monotonic() + self._connect_cooldown
         return False
     
     def disconnect(self) -> None:
@@ -89,7 +137,7 @@ class AVRController:
                 self.connected = False
                 logging.info("Disconnected from AVR")
         except Exception as e:
-            logging.error(f"Error disconnecting: {e}")
+            logging.error("Error disconnecting: %s", e)
             self.connected = False
             self.connection = None
     
@@ -101,6 +149,20 @@ class AVRController:
             command: Command string to send
             retry_on_failure: Whether to retry connection if sending fails
 
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        return self._send_commands((command,), retry_on_failure)
+
+    def _send_commands(self, commands: Sequence[str],
+                       retry_on_failure: bool = True) -> Tuple[bool, str]:
+        """
+        Send commands to the AV receiver in a single write, with optional retry.
+
+        Args:
+            commands: Individual command strings, without separators
+            retry_on_failure: Whether to retry connection if sending fails
+
         Returns:
             Tuple of (success: bool, message: str)
         """
@@ -110,20 +172,26 @@ class AVRController:
                 return False, error_msg
 
         if self.debug_mode:
-            print(f"[DEBUG] Would send command: {command}")
+            for command in commands:
+                print(f"[DEBUG] Would send command: {command}")
             return True, "Debug mode - command printed"
 
         try:
             with self.lock:
                 if not self.connection:
                     return False, "Connection lost"
-                command_bytes = (command + '\r').encode('ascii')
-                self.connection.write(command_bytes)
-                logging.info(f"Sent command: {command}")
+                chunks = [encode_command(command) for command in commands]
+                if len(chunks) == 1:
+                    self.connection.write(chunks[0])
+                else:
+                    self.connection.write_many(chunks)
+                for command in commands:
+                    logging.info("Sent command: %s", command)
                 return True, "Command sent"
-        except Exception as e:
+        except OSError as e:
+            # Socket failure: the connection can't be trusted any more
             error_msg = str(e)
-            logging.error(f"Failed to send command '{command}': {error_msg}")
+            logging.error("Failed to send command '%s': %s", COMMAND_SEPARATOR.join(commands), error_msg)
             self.connected = False
             self.connection = None
             self.last_error = error_msg
@@ -132,11 +200,17 @@ class AVRController:
             if retry_on_failure and self.retry_count < self.max_retries:
                 logging.info("Attempting to reconnect and resend command...")
                 if self.connect(retry=True):
-                    return self.send_command(command, retry_on_failure=False)
+                    return self._send_commands(commands, retry_on_failure=False)
 
             return False, error_msg
+        except Exception as e:
+            # Anything else is a problem with the commands themselves and
+            # leaves the connection usable
+            error_msg = str(e)
+            logging.error("Failed to send command '%s': %s", COMMAND_SEPARATOR.join(commands), error_msg)
+            return False, error_msg
     
-    def read_response(self, timeout: int = 2) -> Optional[str]:
+    def read_response(self, timeout: float = 2) -> Optional[str]:
         """
         Read response from AV receiver.
 
@@ -159,41 +233,52 @@ class AVRController:
                 response = self.connection.read_until(b'\r', timeout)
                 if response:
                     decoded = response.decode('ascii').strip()
-                    logging.info(f"Received response: {decoded}")
+                    logging.info("Received response: %s", decoded)
                     return decoded
-        except Exception as e:
-            logging.error(f"Failed to read response: {e}")
+        except socket.timeout:
+            # Receiver had nothing to say, the connection is still fine
+            logging.debug("No response within %s seconds", timeout)
+        except OSError as e:
+            logging.error("Failed to read response: %s", e)
             self.connected = False
             self.connection = None
+        except Exception as e:
+            # An undecodable response doesn't mean the connection is broken
+            logging.error("Failed to read response: %s", e)
         return None
     
     def send_and_wait(self, command: str, wait_time: float = 1.0) -> Tuple[bool, str]:
         """
         Send command and wait for response - handles multi-line commands.
 
+        All commands are sent in one write, then responses are read as they arrive
+        until there is one per command or wait_time runs out.
+
         Args:
             command: Command string (can contain multiple commands separated by COMMAND_SEPARATOR)
-            wait_time: Time to wait between commands in seconds
+            wait_time: Maximum time to wait for responses in seconds
 
         Returns:
             Tuple of (success: bool, response: str)
         """
         # Handle multi-line commands (separated by COMMAND_SEPARATOR)
-        commands = command.split(COMMAND_SEPARATOR)
-        responses = []
-
-        for cmd in commands:
-            cmd = cmd.strip()
-            if not cmd:
-                continue
+        commands: Sequence[str] = AVR_COMMAND_SEQUENCES.get(command) or tuple(
+            cmd.strip() for cmd in command.split(COMMAND_SEPARATOR) if cmd.strip())
 
-            success, message = self.send_command(cmd)
+        with self._exchange_lock:
+            success, message = self._send_commands(commands)
             if not success:
                 return success, message
 
-            time.sleep(wait_time)
-            response = self.read_response()
-            if response:
+            responses: List[str] = []
+            deadline = time.monotonic() + wait_time
+            while len(responses) < len(commands):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                response = self.read_response(timeout=remaining)
+                if response is None:
+                    break
                 responses.append(response)
 
-        return True, '; '.join(responses) if responses else "Commands sent"
\ No newline at end of file
+        return True, '; '.join(responses) if responses else "Commands sent"
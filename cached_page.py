@@ -0,0 +1,53 @@
+"""
+Pre-rendered page cache for the web interface.
+"""
+import gzip
+import hashlib
+from typing import Any, Dict, Tuple
+
+try:
+    import brotli
+except ImportError:
+    # brotli not installed, serve gzip and identity only
+    brotli = None
+
+# Browser cache lifetime for the page; revalidation uses the ETag afterwards
+CACHE_CONTROL = 'public, max-age=60'
+
+
+class CachedPage:
+    """A rendered page, precompressed once and served as-is."""
+
+    def __init__(self, html: str):
+        """
+        Initialize cached page.
+
+        Args:
+            html: Fully rendered page markup
+        """
+        self.body = html.encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+        # Compressed variants keyed by content coding, with their own ETags
+        self.variants: Dict[str, Tuple[bytes, str]] = {
+            'gzip': (gzip.compress(self.body, 6), f'{self.etag}-gzip')
+        }
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(self.body, quality=5), f'{self.etag}-br')
+
+    def select(self, accept_encodings: Any) -> Tuple[bytes, str, str]:
+        """
+        Pick the smallest variant the client accepts.
+
+        Args:
+            accept_encodings: The request's parsed Accept-Encoding header
+
+        Returns:
+            Tuple of (body: bytes, etag: str, content_encoding: str), where
+            content_encoding is empty for the uncompressed body
+        """
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings.quality(encoding) > 0:
+                body, etag = self.variants[encoding]
+                return body, etag, encoding
+        return self.body, self.etag, ''
@@ -2,22 +2,59 @@
 Command validation and sanitization utilities for AVR commands.
 """
 import re
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import FrozenSet, Tuple, Optional
+from avr_commands import AVR_COMMAND_SEQUENCES
 
 # Valid command patterns for Denon/Marantz receivers
 # Commands typically consist of 2-10 uppercase letters and optional digits
 VALID_COMMAND_PATTERN = re.compile(r'^[A-Z]{2,10}(?:\d{0,3}|UP|DOWN|ON|OFF)?$')
 
+# Known commands, accepted without checking the grammar: every command the
+# app sends itself, plus power, mute and all main volume levels including
+# half steps (MV505 is 50.5). Only commands the grammar accepts are kept, so
+# the lookup is a fast path and never changes what is valid.
+FROZEN_COMMANDS: FrozenSet[str] = frozenset(
+    command for command in (
+        *(command for sequence in AVR_COMMAND_SEQUENCES.values() for command in sequence),
+        'PWON', 'PWSTANDBY', 'MUON', 'MUOFF', 'MVUP', 'MVDOWN',
+        *(f'MV{level:02d}' for level in range(100)),
+        *(f'MV{level:02d}5' for level in range(100)),
+    )
+    if VALID_COMMAND_PATTERN.fullmatch(command)
+)
+
+# validate_command checks VALID_COMMAND_PATTERN without the regex engine: each
+# byte is classified as a letter (1), digit (2) or anything else (0)
+_CHAR_CLASSES = bytes(1 if 65 <= i <= 90 else 2 if 48 <= i <= 57 else 0 for i in range(256))
+_LETTER, _DIGIT = b'\x01', b'\x02'
+
+# Optional all-letter suffixes; they can only be told apart from the
+# letters before them by length
+_WORD_SUFFIXES = ('UP', 'DOWN', 'ON', 'OFF')
+
+# A whole multi-line command sequence whose lines all match
+# VALID_COMMAND_PATTERN, allowing surrounding whitespace and blank lines. Anything it
+# rejects is checked line by line to report the failing command.
+_COMMAND_LINE = r'[ \t\r\f\v]*(?:[A-Z]{2,10}(?:[0-9]{0,3}|UP|DOWN|ON|OFF)?[ \t\r\f\v]*)?'
+_COMMAND_SEQUENCE_PATTERN = re.compile(rf'{_COMMAND_LINE}(?:\n{_COMMAND_LINE})*')
+
 # Maximum command length
 MAX_COMMAND_LENGTH = 50
 
 # Dangerous characters that should not appear in commands
-FORBIDDEN_CHARS = set('\x00\r\n;|&$`\\<>()[]{}')
+FORBIDDEN_CHARS = frozenset('\x00\r\n;|&$`\\<>()[]{}')
+_FORBIDDEN_PATTERN = re.compile(f"[{re.escape(''.join(sorted(FORBIDDEN_CHARS)))}]")
+
+# str.translate table dropping control characters and forbidden characters
+_DROP_TABLE = dict.fromkeys([*range(32), *map(ord, FORBIDDEN_CHARS)])
 
 
+@lru_cache(maxsize=1024)
 def validate_command(command: str) -> Tuple[bool, Optional[str]]:
     """
-    Validate a single AVR command.
+    Validate a single AVR command. Results are cached, as the same commands
+    are validated repeatedly.
 
     Args:
         command: The command string to validate
@@ -25,6 +62,9 @@ def validate_command(command: str) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid: bool, error_message: Optional[str])
     """
+    if command in FROZEN_COMMANDS:
+        return True, None
+
     if not command:
         return False, "Command cannot be empty"
 
@@ -32,16 +72,44 @@ def validate_command(command: str) -> Tuple[bool, Optional[str]]:
     if len(command) > MAX_COMMAND_LENGTH:
         return False, f"Command exceeds maximum length of {MAX_COMMAND_LENGTH} characters"
 
+    # A command matching the pattern can only contain A-Z and 0-9, so the
+    # grammar check decides the common case. The forbidden character scan
+    # only runs to explain a rejection.
+    if _matches_command_grammar(command):
+        return True, None
+
     # Check for forbidden characters
-    forbidden_found = FORBIDDEN_CHARS.intersection(set(command))
+    forbidden_found = set(_FORBIDDEN_PATTERN.findall(command))
     if forbidden_found:
         return False, f"Command contains forbidden characters: {forbidden_found}"
 
-    # Check against pattern for known good commands
-    if not VALID_COMMAND_PATTERN.match(command):
-        return False, f"Command '{command}' does not match expected pattern"
+    return False, f"Command '{command}' does not match expected pattern"
 
-    return True, None
+
+def _matches_command_grammar(command: str) -> bool:
+    """
+    Check a command against VALID_COMMAND_PATTERN using byte classification.
+
+    Args:
+        command: The command string to check
+
+    Returns:
+        True if the whole command matches the pattern
+    """
+    if not command.isascii():
+        return False
+    classes = command.encode('ascii').translate(_CHAR_CLASSES)
+    letters = len(classes) - len(classes.lstrip(_LETTER))
+    suffix = classes[letters:]
+
+    if suffix:
+        # Letters followed by up to three digits
+        return 2 <= letters <= 10 and len(suffix) <= 3 and suffix.lstrip(_DIGIT) == b''
+
+    # All letters: either 2-10 letters, or 2-10 letters plus a word suffix
+    if 2 <= letters <= 10:
+        return True
+    return any(2 <= letters - len(word) <= 10 and command.endswith(word) for word in _WORD_SUFFIXES)
 
 
 def sanitize_command(command: str) -> str:
@@ -54,19 +122,9 @@ def sanitize_command(command: str) -> str:
     Returns:
         Sanitized command string
     """
-    # Remove any whitespace
-    sanitized = command.strip()
-
-    # Remove any control characters
-    sanitized = ''.join(char for char in sanitized if ord(char) >= 32)
-
-    # Remove forbidden characters
-    sanitized = ''.join(char for char in sanitized if char not in FORBIDDEN_CHARS)
-
-    # Convert to uppercase (standard for Denon/Marantz)
-    sanitized = sanitized.upper()
-
-    return sanitized
+    # Remove surrounding whitespace, then control and forbidden characters
+    # in one pass, and convert to uppercase (standard for Denon/Marantz)
+    return command.strip().translate(_DROP_TABLE).upper()
 
 
 def validate_and_sanitize(command: str) -> Tuple[bool, str, Optional[str]]:
@@ -104,6 +162,9 @@ def validate_custom_command(command: str, allow_multiline: bool = True) -> Tuple
 
     # Split into individual commands
     if allow_multiline:
+        # Valid sequences are accepted with a single scan
+        if _COMMAND_SEQUENCE_PATTERN.fullmatch(command):
+            return True, None
         commands = [cmd.strip() for cmd in command.split('\n') if cmd.strip()]
     else:
         commands = [command]
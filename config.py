@@ -1,5 +1,8 @@
 import os
-import argparse
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from typing import List, Union
 from pathlib import Path
 
@@ -13,6 +16,36 @@ except ImportError:
     # python-dotenv not installed, skip .env loading
     pass
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def configure_logging(log_level: str) -> None:
+    """
+    Configure root logging with handler I/O on a background thread.
+
+    Records go through a QueueHandler to a QueueListener thread that writes
+    them to stderr, so a slow log destination (a journald or docker pipe)
+    never blocks a request handler or the event loop. Like
+    logging.basicConfig, this does nothing if the root logger already has
+    handlers.
+
+    Args:
+        log_level: Logging level name (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler)
+
+    root.setLevel(getattr(logging, log_level))
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+
 
 class Config:
     """Application configuration from command-line arguments and environment variables."""
@@ -43,9 +76,13 @@ class Config:
             debug = os.environ.get('DEBUG', '').lower() == 'true'
 
         self.args = Args()
+        self._apply_args()
 
     def parse_args(self) -> None:
         """Parse command-line arguments and environment variables."""
+        # Imported here so ASGI imports, which never parse arguments, skip it
+        import argparse
+
         parser = argparse.ArgumentParser(description='DiscoAVR - AV Receiver Web Controller')
         parser.add_argument('--avr-host', default=os.environ.get('AVR_HOST', '192.168.1.100'),
                           help='AV Receiver IP address (default: 192.168.1.100)')
@@ -67,52 +104,39 @@ class Config:
                           help='Enable debug mode')
 
         self.args = parser.parse_args()
+        self._apply_args()
     
-    @property
-    def AVR_HOST(self) -> str:
-        """AV Receiver hostname or IP address."""
-        return self.args.avr_host
-
-    @property
-    def AVR_PORT(self) -> int:
-        """AV Receiver telnet port."""
-        return self.args.avr_port
-
-    @property
-    def AVR_TIMEOUT(self) -> int:
-        """AV Receiver connection timeout in seconds."""
-        return self.args.avr_timeout
-
-    @property
-    def HOST(self) -> str:
-        """Web server host."""
-        return self.args.host
-
-    @property
-    def PORT(self) -> int:
-        """Web server port."""
-        return self.args.port
-
-    @property
-    def DEBUG(self) -> bool:
-        """Debug mode enabled."""
-        return self.args.debug
-
-    @property
-    def LOG_LEVEL(self) -> str:
-        """Logging level string (DEBUG, INFO, WARNING, ERROR, CRITICAL)."""
-        return self.args.log_level
-
-    @property
-    def CORS_ORIGINS(self) -> Union[str, List[str]]:
+    def _apply_args(self) -> None:
+        """Copy the parsed settings onto plain attributes."""
+        args = self.args
+        # AV Receiver hostname or IP address
+        self.AVR_HOST: str = args.avr_host
+        # AV Receiver telnet port
+        self.AVR_PORT: int = args.avr_port
+        # AV Receiver connection timeout in seconds
+        self.AVR_TIMEOUT: int = args.avr_timeout
+        # Web server host and port
+        self.HOST: str = args.host
+        self.PORT: int = args.port
+        # Debug mode enabled
+        self.DEBUG: bool = args.debug
+        # Logging level string (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        self.LOG_LEVEL: str = args.log_level
+        # Either '*' for all origins or list of allowed origin strings
+        self.CORS_ORIGINS: Union[str, List[str]] = self._parse_cors_origins(args.cors_origins)
+
+    @staticmethod
+    def _parse_cors_origins(origins: str) -> Union[str, List[str]]:
         """
         Parse CORS origins - can be '*' or comma-separated list.
 
+        Args:
+            origins: Raw --cors-origins / CORS_ORIGINS value
+
         Returns:
             Either '*' for all origins or list of allowed origin strings
         """
-        origins = self.args.cors_origins
         if origins == '*':
             return '*'
         # Split by comma and strip whitespace
-        return [origin.strip() for origin in origins.split(',') if origin.strip()]
\ No newline at end of file
+        return [origin.strip() for origin in origins.split(',') if origin.strip()]
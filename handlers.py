@@ -0,0 +1,57 @@
+"""
+Request handling shared by the sync (app.py) and async (async_app.py) applications.
+"""
+import logging
+from typing import Any, Optional, Tuple
+from avr_commands import AVR_COMMANDS, COMMAND_SEPARATOR, MAX_COMMAND_BATCH
+from command_validator import validate_custom_command, sanitize_command
+
+
+def resolve_command_batch(command_names: Any) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolve a batch of predefined command names into one multi-line command.
+
+    Args:
+        command_names: List of names from AVR_COMMANDS, as received in the request
+
+    Returns:
+        Tuple of (command: Optional[str], error_message: Optional[str])
+    """
+    if not command_names or not isinstance(command_names, list):
+        return None, 'No commands provided'
+
+    if len(command_names) > MAX_COMMAND_BATCH:
+        return None, f'Too many commands (maximum {MAX_COMMAND_BATCH})'
+
+    # Check types first: lists or objects in the batch aren't hashable
+    if not all(isinstance(name, str) for name in command_names):
+        return None, 'Command names must be strings'
+
+    unknown = [name for name in command_names if name not in AVR_COMMANDS]
+    if unknown:
+        return None, f'Unknown commands: {unknown}'
+
+    return COMMAND_SEPARATOR.join(AVR_COMMANDS[name] for name in command_names), None
+
+
+def resolve_custom_command(command: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Validate and sanitize a custom command received in a request.
+
+    Args:
+        command: Raw command string (may contain newlines for multi-command)
+
+    Returns:
+        Tuple of (sanitized_command: Optional[str], error_message: Optional[str])
+    """
+    if not command:
+        return None, 'No command provided'
+
+    # Validate and sanitize the custom command
+    is_valid, error_msg = validate_custom_command(command, allow_multiline=True)
+    if not is_valid:
+        logging.warning("Invalid custom command rejected: %s - %s", command, error_msg)
+        return None, f'Invalid command: {error_msg}'
+
+    # Sanitize the command (though validation should have caught issues)
+    return sanitize_command(command), None
@@ -3,14 +3,25 @@ Simple telnet client implementation using sockets.
 Replacement for deprecated telnetlib module.
 """
 import socket
-import threading
-from typing import Optional
+from typing import List, Optional, Tuple
+
+
+# Size of the reusable receive buffer
+RECV_BUFFER_SIZE = 4096
+
+# sendmsg is not available on Windows
+_HAVE_SENDMSG = hasattr(socket.socket, 'sendmsg')
 
 
 class TelnetClient:
-    """Simple synchronous telnet client using raw sockets."""
+    """
+    Simple synchronous telnet client using raw sockets.
 
-    def __init__(self, host: str, port: int, timeout: float = 5.0):
+    The client does no locking of its own; callers sharing one client
+    between threads must serialize calls, as AVRController does.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 5.0, nodelay: bool = True):
         """
         Initialize telnet client.
 
@@ -18,33 +29,49 @@ class TelnetClient:
             host: Hostname or IP address
             port: Port number
             timeout: Connection timeout in seconds
+            nodelay: Disable Nagle's algorithm so short commands are sent immediately
         """
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.nodelay = nodelay
         self.socket: Optional[socket.socket] = None
-        self.lock = threading.Lock()
+        # Data received past the last delimiter returned by read_until
+        self._buffer = b''
+        # Receive buffer reused by every recv_into call
+        self._rxbuf = bytearray(RECV_BUFFER_SIZE)
+        self._rxview = memoryview(self._rxbuf)
 
-    def open(self) -> None:
-        """Open connection to remote host."""
-        with self.lock:
-            if self.socket:
-                self.close()
+    def open(self, connect_timeout: Optional[float] = None) -> None:
+        """
+        Open connection to remote host.
 
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(self.timeout)
-            self.socket.connect((self.host, self.port))
+        Args:
+            connect_timeout: Optional limit for establishing the connection;
+                reads and writes still use the client timeout
+        """
+        if self.socket:
+            self.close()
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.nodelay:
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Let the OS notice a receiver that vanished without closing
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.socket.settimeout(self.timeout if connect_timeout is None else connect_timeout)
+        self.socket.connect((self.host, self.port))
+        self.socket.settimeout(self.timeout)
 
     def close(self) -> None:
         """Close the connection."""
-        with self.lock:
-            if self.socket:
-                try:
-                    self.socket.close()
-                except Exception:
-                    pass
-                finally:
-                    self.socket = None
+        if self.socket:
+            try:
+                self.socket.close()
+            except Exception:
+                pass
+            finally:
+                self.socket = None
+                self._buffer = b''
 
     def write(self, data: bytes) -> None:
         """
@@ -56,10 +83,39 @@ class TelnetClient:
         Raises:
             ConnectionError: If not connected or send fails
         """
-        with self.lock:
-            if not self.socket:
-                raise ConnectionError("Not connected")
-            self.socket.sendall(data)
+        if not self.socket:
+            raise ConnectionError("Not connected")
+        self.socket.sendall(data)
+
+    def write_many(self, chunks: List[bytes]) -> None:
+        """
+        Write several chunks to the socket with a single send.
+
+        Where the platform supports sendmsg the chunks are handed to the
+        kernel as they are; otherwise they are joined and sent with sendall.
+
+        Args:
+            chunks: Byte strings to send, in order
+
+        Raises:
+            ConnectionError: If not connected or send fails
+        """
+        if not _HAVE_SENDMSG:
+            self.write(b''.join(chunks))
+            return
+
+        if not self.socket:
+            raise ConnectionError("Not connected")
+        buffers = [memoryview(chunk) for chunk in chunks if chunk]
+        while buffers:
+            sent = self.socket.sendmsg(buffers)
+            # sendmsg may send only part of the data; drop what went out
+            # and continue from there
+            while buffers and sent >= len(buffers[0]):
+                sent -= len(buffers[0])
+                buffers.pop(0)
+            if sent:
+                buffers[0] = buffers[0][sent:]
 
     def read_until(self, delimiter: bytes, timeout: Optional[float] = None) -> bytes:
         """
@@ -70,28 +126,87 @@ class TelnetClient:
             timeout: Optional timeout override
 
         Returns:
-            Bytes read including delimiter
+            Bytes read up to and including the first delimiter, or whatever
+            was received if the connection closed first
 
         Raises:
             ConnectionError: If not connected
             socket.timeout: If timeout occurs
         """
-        with self.lock:
-            if not self.socket:
-                raise ConnectionError("Not connected")
-
-            original_timeout = self.socket.gettimeout()
+        if not self.socket:
+            raise ConnectionError("Not connected")
+
+        original_timeout = self.socket.gettimeout()
+        if timeout is not None:
+            self.socket.settimeout(timeout)
+
+        try:
+            buffer = self._buffer
+            end = buffer.find(delimiter)
+            if end < 0:
+                buffer, end = self._receive_until(self.socket, delimiter, buffer)
+
+            # Several responses can arrive in one recv; return the first
+            # and keep the rest for the next call
+            if end < 0:
+                self._buffer = b''
+                return buffer
+            end += len(delimiter)
+            self._buffer = buffer[end:]
+            return buffer[:end]
+        finally:
             if timeout is not None:
-                self.socket.settimeout(timeout)
+                self.socket.settimeout(original_timeout)
 
-            try:
-                buffer = b''
-                while delimiter not in buffer:
-                    chunk = self.socket.recv(1024)
-                    if not chunk:
-                        break
-                    buffer += chunk
-                return buffer
-            finally:
-                if timeout is not None:
-                    self.socket.settimeout(original_timeout)
+    def _receive_until(self, sock: socket.socket, delimiter: bytes,
+                       buffer: bytes) -> Tuple[bytes, int]:
+        """
+        Receive until the delimiter arrives or the connection closes.
+
+        Data is received into a reusable buffer and searched there; chunks
+        are collected in a list and joined once, and only the newest chunk
+        (plus enough carried-over bytes to catch a delimiter split across
+        chunks) is searched, so a long response costs O(n).
+
+        Args:
+            sock: Connected socket to receive from
+            delimiter: Byte sequence to read until
+            buffer: Previously received data that contains no delimiter
+
+        Returns:
+            Tuple of (received data, index of the delimiter or -1)
+
+        Raises:
+            socket.timeout: If timeout occurs, after keeping the partial data
+        """
+        chunks = [buffer] if buffer else []
+        size = len(buffer)
+        keep = len(delimiter) - 1
+        tail = buffer[-keep:] if keep else b''
+        end = -1
+        try:
+            while True:
+                received = sock.recv_into(self._rxbuf)
+                if not received:
+                    break
+                if tail:
+                    # Delimiter split between the previous chunk and this
+                    # one; it comes before any delimiter inside this chunk
+                    index = (tail + self._rxview[:min(keep, received)].tobytes()).find(delimiter)
+                    if index >= 0:
+                        end = size - len(tail) + index
+                if end < 0:
+                    index = self._rxbuf.find(delimiter, 0, received)
+                    if index >= 0:
+                        end = size + index
+                chunks.append(self._rxview[:received].tobytes())
+                if end >= 0:
+                    break
+                size += received
+                if keep:
+                    tail = (tail + chunks[-1])[-keep:]
+        except socket.timeout:
+            # Keep the partial response for the next call
+            self._buffer = b''.join(chunks)
+            raise
+        return b''.join(chunks), end
@@ -0,0 +1,84 @@
+import os
+import sys
+import pytest
+
+# Add parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from avr_controller import AVRController
+from tests.fakes import FakeTelnetClient, RecordingAsyncAVR, RecordingAVR
+
+
+@pytest.fixture
+def fake_telnet(monkeypatch):
+    """
+    Make avr_controller create a FakeTelnetClient and return it. Every
+    connection the controller opens gets this same client; the number
+    of connections is kept in fake_telnet.created.
+    """
+    fake = FakeTelnetClient()
+    fake.created = 0
+
+    def create(*args, **kwargs):
+        fake.created += 1
+        return fake
+
+    monkeypatch.setattr('avr_controller.TelnetClient', create)
+    return fake
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    """
+    The Flask app in testing mode. It is imported here rather than at the
+    top of a test module, so workers that never run app tests skip
+    importing it.
+    """
+    from app import app
+
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture(scope='session')
+def client(flask_app):
+    """A test client for the Flask app, shared by the whole session"""
+    with flask_app.app_context():
+        yield flask_app.test_client()
+
+
+@pytest.fixture
+def avr(flask_app, monkeypatch):
+    """Replace the Flask app's controller with a RecordingAVR and return it"""
+    recording = RecordingAVR()
+    monkeypatch.setattr('app.avr', recording)
+    return recording
+
+
+@pytest.fixture(scope='session')
+def quart_app():
+    """The Quart app in testing mode, imported on first use like flask_app"""
+    from async_app import app
+
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def async_avr(quart_app, monkeypatch):
+    """Replace the Quart app's controller with a RecordingAsyncAVR and return it"""
+    recording = RecordingAsyncAVR()
+    monkeypatch.setattr('async_app.avr', recording)
+    return recording
+
+
+@pytest.fixture
+def controller():
+    """A disconnected controller for a receiver that isn't there"""
+    return AVRController('192.168.1.100', 60128, 5)
+
+
+@pytest.fixture
+def debug_controller():
+    """A controller in debug mode, which never opens a connection"""
+    return AVRController('192.168.1.100', 60128, 5, debug_mode=True)
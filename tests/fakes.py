@@ -0,0 +1,108 @@
+"""
+Test doubles shared by the test modules.
+"""
+import socket
+
+
+class FakeTelnetClient:
+    """
+    Stand-in for TelnetClient that records what is sent and replays
+    canned responses.
+
+    Each write or write_many call is recorded as one entry in writes.
+    read_until returns the next item from the responses iterator, raising
+    it instead if it is an exception, and times out once it runs out.
+    """
+
+    def __init__(self, host: str = '192.168.1.100', port: int = 60128, timeout: float = 5.0,
+                 nodelay: bool = True):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.nodelay = nodelay
+        self.responses = iter(())
+        self.writes = []
+        self.connect_timeouts = []
+        self.read_timeouts = []
+        self.close_count = 0
+        self.open_error = None
+        self.write_error = None
+
+    def open(self, connect_timeout=None):
+        self.connect_timeouts.append(connect_timeout)
+        if self.open_error:
+            raise self.open_error
+
+    def close(self):
+        self.close_count += 1
+
+    def write(self, data):
+        if self.write_error:
+            raise self.write_error
+        self.writes.append(data)
+
+    def write_many(self, chunks):
+        self.write(b''.join(chunks))
+
+    def read_until(self, delimiter, timeout=None):
+        self.read_timeouts.append(timeout)
+        response = next(self.responses, None)
+        if response is None:
+            raise socket.timeout('timed out')
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class RecordingAVR:
+    """
+    Stand-in for the app's AVRController that records each call as a
+    (method, args) tuple in calls and returns the configured results.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.connected = False
+        self.connect_result = True
+        self.send_result = (True, '')
+
+    def connect(self):
+        self.calls.append(('connect',))
+        return self.connect_result
+
+    def disconnect(self):
+        self.calls.append(('disconnect',))
+
+    def send_and_wait(self, command):
+        self.calls.append(('send_and_wait', command))
+        return self.send_result
+
+
+class RecordingAsyncAVR:
+    """
+    Stand-in for the async app's AsyncAVRController that records each call
+    as a (method, args) tuple in calls and returns the configured results.
+    Replace state with a new dict to change it, as the real controller
+    hands out the same dict until the state changes.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.connected = False
+        self.connect_result = True
+        self.send_result = (True, '')
+        self.state = {'power': True, 'volume': 50, 'muted': False, 'input_source': 'CD'}
+
+    async def connect(self):
+        self.calls.append(('connect',))
+        return self.connect_result
+
+    async def disconnect(self):
+        self.calls.append(('disconnect',))
+
+    async def send_and_wait(self, command):
+        self.calls.append(('send_and_wait', command))
+        return self.send_result
+
+    def get_state_dict(self):
+        return self.state
@@ -1,162 +1,206 @@
 import pytest
-import json
-from unittest.mock import Mock, patch
-import sys
-import os
-
-# Add parent directory to path so we can import app modules
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from app import app
+import gzip
 from avr_controller import AVRController
+from avr_commands import MAX_COMMAND_BATCH
+
+# Request bodies for /api/commands that must be rejected, with the error each gets
+MALFORMED_BATCHES = [
+    ({}, 'No commands provided'),
+    ({'commands': []}, 'No commands provided'),
+    ({'commands': 'power_on'}, 'No commands provided'),
+    ({'commands': ['power_on'] * (MAX_COMMAND_BATCH + 1)},
+     f'Too many commands (maximum {MAX_COMMAND_BATCH})'),
+    ({'commands': [['power_on']]}, 'Command names must be strings'),
+    ({'commands': [{}]}, 'Command names must be strings'),
+    ({'commands': ['power_on', 5]}, 'Command names must be strings'),
+    ({'commands': ['power_on', 'bogus']}, "Unknown commands: ['bogus']"),
+]
 
 
 class TestFlaskApp:
     """Test Flask application logic"""
 
-    def setup_method(self):
-        """Set up test fixtures"""
-        app.config['TESTING'] = True
-        self.client = app.test_client()
-        self.ctx = app.app_context()
-        self.ctx.push()
-
-    def teardown_method(self):
-        """Clean up after tests"""
-        self.ctx.pop()
-
-    def test_index_page_loads(self):
+    def test_index_page_loads(self, client):
         """Test that index page loads successfully"""
-        response = self.client.get('/')
+        response = client.get('/')
         assert response.status_code == 200
         assert b'DiscoAVR' in response.data
 
-    @patch('app.avr')
-    def test_connect_endpoint_success(self, mock_avr):
+    def test_index_page_revalidates_with_etag(self, client):
+        """Test that the cached index page answers a matching ETag with 304"""
+        etag = client.get('/').headers['ETag']
+
+        response = client.get('/', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_index_page_served_precompressed(self, client):
+        """Test that clients accepting gzip get the precompressed index page"""
+        response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert b'DiscoAVR' in gzip.decompress(response.data)
+
+    def test_connect_endpoint_success(self, avr, client):
         """Test successful connection endpoint"""
-        mock_avr.connect.return_value = True
-        mock_avr.connected = True
+        avr.connect_result = True
+        avr.connected = True
         
-        response = self.client.post('/api/connect')
-        data = json.loads(response.data)
+        response = client.post('/api/connect')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == True
         assert data['connected'] == True
-        mock_avr.connect.assert_called_once()
+        assert avr.calls == [('connect',)]
 
-    @patch('app.avr')
-    def test_connect_endpoint_failure(self, mock_avr):
+    def test_connect_endpoint_failure(self, avr, client):
         """Test failed connection endpoint"""
-        mock_avr.connect.return_value = False
-        mock_avr.connected = False
+        avr.connect_result = False
+        avr.connected = False
         
-        response = self.client.post('/api/connect')
-        data = json.loads(response.data)
+        response = client.post('/api/connect')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == False
         assert data['connected'] == False
 
-    @patch('app.avr')
-    def test_disconnect_endpoint(self, mock_avr):
+    def test_disconnect_endpoint(self, avr, client):
         """Test disconnect endpoint"""
-        mock_avr.connected = False
+        avr.connected = False
         
-        response = self.client.post('/api/disconnect')
-        data = json.loads(response.data)
+        response = client.post('/api/disconnect')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == True
         assert data['connected'] == False
-        mock_avr.disconnect.assert_called_once()
+        assert avr.calls == [('disconnect',)]
 
-    @patch('app.avr')
-    def test_status_endpoint(self, mock_avr):
+    def test_status_endpoint(self, avr, client):
         """Test status endpoint"""
-        mock_avr.connected = True
+        avr.connected = True
         
-        response = self.client.get('/api/status')
-        data = json.loads(response.data)
+        response = client.get('/api/status')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['connected'] == True
 
-    @patch('app.avr')
-    def test_preset_command_success(self, mock_avr):
+    def test_status_endpoint_follows_connection(self, avr, client):
+        """Test status body tracks the connection and allows brief caching"""
+        avr.connected = False
+        response = client.get('/api/status')
+        assert response.get_json() == {'connected': False}
+        assert response.headers['Cache-Control'] == 'max-age=1'
+
+        avr.connected = True
+        response = client.get('/api/status')
+        assert response.get_json() == {'connected': True}
+
+    def test_preset_command_success(self, avr, client):
         """Test sending preset command successfully"""
-        mock_avr.send_and_wait.return_value = (True, "PWON")
-        mock_avr.connected = True
+        avr.send_result = (True, "PWON")
+        avr.connected = True
         
-        response = self.client.post('/api/command/power_on')
-        data = json.loads(response.data)
+        response = client.post('/api/command/power_on')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == True
         assert data['command'] == 'PWON'
         assert data['response'] == 'PWON'
         assert data['connected'] == True
-        mock_avr.send_and_wait.assert_called_once_with('PWON')
+        assert avr.calls == [('send_and_wait', 'PWON')]
 
-    @patch('app.avr')
-    def test_preset_command_failure(self, mock_avr):
+    def test_preset_command_failure(self, avr, client):
         """Test sending preset command failure"""
-        mock_avr.send_and_wait.return_value = (False, "Connection error")
-        mock_avr.connected = False
+        avr.send_result = (False, "Connection error")
+        avr.connected = False
         
-        response = self.client.post('/api/command/power_on')
-        data = json.loads(response.data)
+        response = client.post('/api/command/power_on')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == False
         assert data['connected'] == False
 
-    def test_unknown_preset_command(self):
+    def test_unknown_preset_command(self, client):
         """Test sending unknown preset command"""
-        response = self.client.post('/api/command/unknown_command')
-        data = json.loads(response.data)
+        response = client.post('/api/command/unknown_command')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == False
         assert data['error'] == 'Unknown command'
 
-    @patch('app.avr')
-    def test_custom_command_success(self, mock_avr):
+    def test_custom_command_success(self, avr, client):
         """Test sending custom command successfully"""
-        mock_avr.send_and_wait.return_value = (True, "Custom response")
-        mock_avr.connected = True
+        avr.send_result = (True, "Custom response")
+        avr.connected = True
         
-        response = self.client.post('/api/command', 
-                                  data=json.dumps({'command': 'CUSTOM'}),
-                                  content_type='application/json')
-        data = json.loads(response.data)
+        response = client.post('/api/command', json={'command': 'CUSTOM'})
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == True
         assert data['response'] == 'Custom response'
-        mock_avr.send_and_wait.assert_called_once_with('CUSTOM')
+        assert avr.calls == [('send_and_wait', 'CUSTOM')]
 
-    def test_custom_command_no_command(self):
+    def test_custom_command_no_command(self, client):
         """Test sending custom command without command parameter"""
-        response = self.client.post('/api/command', 
-                                  data=json.dumps({}),
-                                  content_type='application/json')
-        data = json.loads(response.data)
+        response = client.post('/api/command', json={})
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == False
         assert data['error'] == 'No command provided'
 
-    @patch('app.avr')
-    def test_multi_line_command_handling(self, mock_avr):
+    def test_multi_line_command_handling(self, avr, client):
         """Test that multi-line commands are handled properly"""
-        mock_avr.send_and_wait.return_value = (True, "MVUP; MVUP; MVUP")
-        mock_avr.connected = True
+        avr.send_result = (True, "MVUP; MVUP; MVUP")
+        avr.connected = True
         
-        response = self.client.post('/api/command/volume_up_5')
-        data = json.loads(response.data)
+        response = client.post('/api/command/volume_up_5')
+        data = response.get_json()
         
         assert response.status_code == 200
         assert data['success'] == True
         # Should call send_and_wait with the multi-line command
-        mock_avr.send_and_wait.assert_called_once_with('MVUP\nMVUP\nMVUP\nMVUP\nMVUP')
\ No newline at end of file
+        assert avr.calls == [('send_and_wait', 'MVUP\nMVUP\nMVUP\nMVUP\nMVUP')]
+
+    def test_preset_batch_sends_single_sequence(self, avr, client):
+        """Test that a batch of presets is sent as one multi-line command"""
+        avr.send_result = (True, "PWON; MV52")
+        avr.connected = True
+
+        response = client.post('/api/commands', json={'commands': ['power_on', 'volume_52']})
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['success'] == True
+        assert data['command'] == 'PWON\nMV52'
+        assert avr.calls == [('send_and_wait', 'PWON\nMV52')]
+
+    def test_preset_batch_rejects_unknown_commands(self, avr, client):
+        """Test that a batch containing an unknown command is not sent at all"""
+        response = client.post('/api/commands', json={'commands': ['power_on', 'bogus']})
+        data = response.get_json()
+
+        assert data['success'] == False
+        assert 'bogus' in data['error']
+        assert avr.calls == []
+
+    @pytest.mark.parametrize('body, error', MALFORMED_BATCHES)
+    def test_preset_batch_rejects_malformed_batches(self, avr, client, body, error):
+        """Test that every malformed batch fails the same way, without sending anything"""
+        response = client.post('/api/commands', json=body)
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data == {'success': False, 'error': error}
+        assert avr.calls == []
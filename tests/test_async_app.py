@@ -0,0 +1,133 @@
+import asyncio
+import json
+import pytest
+from async_avr_controller import ReceiverState
+from tests.test_app import MALFORMED_BATCHES
+
+
+def request(quart_app, method, path, **kwargs):
+    """Make one request with the Quart test client and return (status, headers, parsed body)"""
+    async def scenario():
+        client = quart_app.test_client()
+        response = await getattr(client, method)(path, **kwargs)
+        return response.status_code, response.headers, json.loads(await response.get_data())
+
+    return asyncio.run(scenario())
+
+
+class TestAsyncApp:
+    """Test the JSON bodies and WebSocket messages of the async app"""
+
+    def test_preset_command_response_fields(self, quart_app, async_avr):
+        """Test that the pre-encoded preset command response parses with all fields"""
+        async_avr.connected = True
+        async_avr.send_result = (True, 'PWON')
+
+        status, _, data = request(quart_app, 'post', '/api/command/power_on')
+
+        assert status == 200
+        assert data == {'command': 'PWON', 'success': True, 'response': 'PWON',
+                        'connected': True, 'state': async_avr.state}
+        assert async_avr.calls == [('send_and_wait', 'PWON')]
+
+    def test_preset_command_escapes_multi_line_command(self, quart_app, async_avr):
+        """Test that newlines in a preset command survive the JSON encoding"""
+        async_avr.send_result = (False, 'Connection lost')
+
+        _, _, data = request(quart_app, 'post', '/api/command/volume_up_5')
+
+        assert data['command'] == 'MVUP\nMVUP\nMVUP\nMVUP\nMVUP'
+        assert (data['success'], data['response'], data['connected']) == (False, 'Connection lost', False)
+
+    def test_unknown_preset_command(self, quart_app, async_avr):
+        """Test that an unknown preset is rejected without sending anything"""
+        _, _, data = request(quart_app, 'post', '/api/command/bogus')
+
+        assert data == {'success': False, 'error': 'Unknown command'}
+        assert async_avr.calls == []
+
+    def test_custom_command_response_fields(self, quart_app, async_avr):
+        """Test that a custom command is sanitized and its response has no command field"""
+        async_avr.connected = True
+        async_avr.send_result = (True, 'MV51; "quoted"')
+
+        status, _, data = request(quart_app, 'post', '/api/command', json={'command': ' MVUP '})
+
+        assert status == 200
+        assert data == {'success': True, 'response': 'MV51; "quoted"', 'connected': True,
+                        'state': async_avr.state}
+        assert async_avr.calls == [('send_and_wait', 'MVUP')]
+
+    def test_preset_batch_response_fields(self, quart_app, async_avr):
+        """Test that a batch response carries the combined command"""
+        async_avr.connected = True
+        async_avr.send_result = (True, 'PWON; MV52')
+
+        _, _, data = request(quart_app, 'post', '/api/commands',
+                             json={'commands': ['power_on', 'volume_52']})
+
+        assert data == {'command': 'PWON\nMV52', 'success': True, 'response': 'PWON; MV52',
+                        'connected': True, 'state': async_avr.state}
+
+    @pytest.mark.parametrize('body, error', MALFORMED_BATCHES)
+    def test_preset_batch_rejects_malformed_batches(self, quart_app, async_avr, body, error):
+        """Test that every malformed batch fails the same way, without sending anything"""
+        status, _, data = request(quart_app, 'post', '/api/commands', json=body)
+
+        assert status == 200
+        assert data == {'success': False, 'error': error}
+        assert async_avr.calls == []
+
+    def test_status_follows_state_changes(self, quart_app, async_avr):
+        """Test that the status body tracks the connection and a replaced state"""
+        status, headers, data = request(quart_app, 'get', '/api/status')
+
+        assert status == 200
+        assert headers['Cache-Control'] == 'max-age=1'
+        assert data == {'connected': False, 'state': async_avr.state}
+
+        async_avr.connected = True
+        async_avr.state = dict(async_avr.state, volume=51)
+        _, _, data = request(quart_app, 'get', '/api/status')
+
+        assert data == {'connected': True, 'state': async_avr.state}
+        assert data['state']['volume'] == 51
+
+    def test_websocket_sends_state_then_pong(self, quart_app, async_avr):
+        """Test the initial state message and the reply to a ping, both as text frames"""
+        async def scenario():
+            client = quart_app.test_client()
+            async with client.websocket('/ws/state') as websocket:
+                initial = await websocket.receive()
+                await websocket.send(json.dumps({'type': 'ping'}))
+                pong = await websocket.receive()
+            return initial, pong
+
+        async_avr.connected = True
+        initial, pong = asyncio.run(scenario())
+
+        assert isinstance(initial, str) and isinstance(pong, str)
+        assert json.loads(initial) == {'type': 'state_update', 'state': async_avr.state,
+                                       'connected': True}
+        assert json.loads(pong) == {'type': 'pong'}
+
+    def test_broadcast_drops_oldest_messages_when_queue_is_full(self, quart_app, async_avr):
+        """Test that a client that stops reading keeps only the newest state updates"""
+        import async_app
+
+        async def scenario():
+            queue = asyncio.Queue(maxsize=async_app.WEBSOCKET_QUEUE_SIZE)
+            async_app._add_websocket_client(queue)
+            try:
+                for volume in range(async_app.WEBSOCKET_QUEUE_SIZE + 3):
+                    async_avr.state = dict(async_avr.state, volume=volume)
+                    await async_app.broadcast_state_update(ReceiverState(volume=volume))
+            finally:
+                async_app._remove_websocket_clients(queue)
+            return [json.loads(queue.get_nowait()) for _ in range(queue.qsize())]
+
+        messages = asyncio.run(scenario())
+
+        assert len(messages) == async_app.WEBSOCKET_QUEUE_SIZE
+        assert [m['state']['volume'] for m in messages] == list(range(3, async_app.WEBSOCKET_QUEUE_SIZE + 3))
+        assert async_app.websocket_clients == ()
@@ -0,0 +1,475 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from async_avr_controller import AsyncAVRController, INITIAL_RETRY_DELAY, MAX_RETRY_DELAY
+
+
+async def start_fake_receiver(handle_command):
+    """Start a local TCP server that feeds each received command to handle_command"""
+    received = []
+
+    async def handle_client(reader, writer):
+        try:
+            while True:
+                line = await reader.readuntil(b'\r')
+                command = line.decode('ascii').strip()
+                # Ignore the state queries sent on connect and while polling
+                if command.endswith('?'):
+                    continue
+                received.append(command)
+                for reply in handle_command(command, received):
+                    writer.write(reply.encode('ascii') + b'\r')
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle_client, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, port, received
+
+
+class TestAsyncAVRControllerPipelining:
+    """Test response demultiplexing in the async AVR controller"""
+
+    def test_multi_command_sequence_is_pipelined(self):
+        """Test that all commands are written before any response is required"""
+        async def scenario():
+            # Only answer once the whole sequence has arrived; a controller
+            # waiting for each response before sending the next would time out
+            def handle_command(command, received):
+                if len(received) < 3:
+                    return []
+                return ['MV51', 'MV52', 'MV53']
+
+            server, port, received = await start_fake_receiver(handle_command)
+            controller = AsyncAVRController('127.0.0.1', port, 2)
+            try:
+                result = await controller.send_and_wait('MVUP\nMVUP\nMVUP', wait_time=1.0)
+                state = await controller.get_state()
+                return result, received, state.volume
+            finally:
+                await controller.disconnect()
+                server.close()
+                await server.wait_closed()
+
+        (success, response), received, volume = asyncio.run(scenario())
+
+        assert success == True
+        assert response == 'MV51; MV52; MV53'
+        assert received == ['MVUP', 'MVUP', 'MVUP']
+        # The reader task applies every response to the tracked state
+        assert volume == 53
+
+    def test_multi_command_sequence_is_sent_in_one_write(self):
+        """Test that a command sequence goes out as a single write"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            controller.connected = True
+            controller.connection = AsyncMock()
+            result = await controller.send_and_wait('MVUP\nMUOFF\nSICD', wait_time=0.01)
+            return result, controller.connection.write.call_args_list
+
+        (success, response), writes = asyncio.run(scenario())
+
+        assert success == True
+        assert response == "Commands sent"
+        assert [call.args for call in writes] == [(b'MVUP\rMUOFF\rSICD\r',)]
+
+    def test_responses_are_matched_by_prefix(self):
+        """Test that unsolicited responses do not satisfy unrelated commands"""
+        async def scenario():
+            def handle_command(command, received):
+                # Receiver reports an unrelated change before answering
+                return ['PWON', 'SIPHONO']
+
+            server, port, _ = await start_fake_receiver(handle_command)
+            controller = AsyncAVRController('127.0.0.1', port, 2)
+            try:
+                result = await controller.send_and_wait('SIPHONO', wait_time=1.0)
+                state = await controller.get_state()
+                return result, state.power, state.input_source
+            finally:
+                await controller.disconnect()
+                server.close()
+                await server.wait_closed()
+
+        (success, response), power, input_source = asyncio.run(scenario())
+
+        assert success == True
+        assert response == 'SIPHONO'
+        assert power == True
+        assert input_source == 'PHONO'
+
+    def test_response_split_across_reads_is_reassembled(self):
+        """Test that a response arriving in pieces is dispatched once complete"""
+        async def scenario():
+            async def handle_client(reader, writer):
+                await reader.readuntil(b'MV45\r')
+                # One response split over two packets, the second carrying
+                # the start of the next response as well
+                writer.write(b'MV4')
+                await writer.drain()
+                await asyncio.sleep(0.05)
+                writer.write(b'5\rMUO')
+                await writer.drain()
+                await asyncio.sleep(0.05)
+                writer.write(b'N\r')
+                await writer.drain()
+                await reader.read()
+                writer.close()
+
+            server = await asyncio.start_server(handle_client, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            controller = AsyncAVRController('127.0.0.1', port, 2)
+            try:
+                result = await controller.send_and_wait('MV45', wait_time=1.0)
+                for _ in range(100):
+                    if controller.state.muted is not None:
+                        break
+                    await asyncio.sleep(0.01)
+                return result, controller.state.volume, controller.state.muted
+            finally:
+                await controller.disconnect()
+                server.close()
+                await server.wait_closed()
+
+        (success, response), volume, muted = asyncio.run(scenario())
+
+        assert success == True
+        assert response == 'MV45'
+        assert volume == 45
+        assert muted == True
+
+    @pytest.mark.slow
+    def test_missing_response_times_out_without_disconnecting(self):
+        """Test that a command the receiver never answers only costs the wait time"""
+        async def scenario():
+            server, port, _ = await start_fake_receiver(lambda command, received: [])
+            controller = AsyncAVRController('127.0.0.1', port, 2)
+            try:
+                await controller.connect()
+                # Let the first poll send its queries; unanswered, they leave
+                # waiters of their own
+                await asyncio.sleep(0.05)
+                polling = len(controller._pending)
+                result = await controller.send_and_wait('MVUP', wait_time=0.2)
+                return result, controller.connected, len(controller._pending) - polling
+            finally:
+                await controller.disconnect()
+                server.close()
+                await server.wait_closed()
+
+        (success, response), connected, pending = asyncio.run(scenario())
+
+        assert success == True
+        assert response == "Commands sent"
+        assert connected == True
+        assert pending == 0
+
+
+class TestAsyncAVRControllerState:
+    """Test receiver state tracking in the async AVR controller"""
+
+    def test_state_dict_is_reused_until_state_changes(self):
+        """Test that get_state_dict only rebuilds the dictionary after an update"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            first = controller.get_state_dict()
+            second = controller.get_state_dict()
+            await controller._update_state_from_response('MV45')
+            return first, second, controller.get_state_dict(), controller.state.last_updated
+
+        first, second, updated, last_updated = asyncio.run(scenario())
+
+        assert second is first
+        assert updated is not first
+        assert updated['volume'] == 45
+        assert updated['last_updated'] == last_updated.isoformat()
+
+    @pytest.mark.parametrize('response,field,value', [
+        ('PWON', 'power', True),
+        ('PWSTANDBY', 'power', False),
+        ('MV45', 'volume', 45),
+        ('MV505', 'volume', 50),
+        ('MUON', 'muted', True),
+        ('MUOFF', 'muted', False),
+        ('SIPHONO', 'input_source', 'PHONO'),
+        ('MSSTEREO', 'surround_mode', 'STEREO'),
+        ('Z2ON', 'zone2_power', True),
+        ('Z2OFF', 'zone2_power', False),
+        ('Z267', 'zone2_volume', 67),
+        ('Z2MUON', 'zone2_muted', True),
+        ('Z2MUOFF', 'zone2_muted', False),
+    ])
+    def test_response_updates_state(self, response, field, value):
+        """Test that receiver responses are applied to the matching state field"""
+        controller = AsyncAVRController('192.168.1.100', 60128, 5)
+        asyncio.run(controller._update_state_from_response(response))
+
+        assert getattr(controller.state, field) == value
+
+    @pytest.mark.parametrize('response', ['MVMAX 98', 'MV5', 'MV\u0665\u0660', 'Z2CD', 'PWQUERY', 'XX'])
+    def test_unrecognised_response_leaves_state_unchanged(self, response):
+        """Test that responses without a known value don't bump the state version"""
+        controller = AsyncAVRController('192.168.1.100', 60128, 5)
+        asyncio.run(controller._update_state_from_response(response))
+
+        assert controller._state_version == 0
+        assert controller.state.zone2_volume is None
+
+    def test_debug_mode_simulates_commands(self):
+        """Test that debug mode applies commands to the state as the receiver would"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5, debug_mode=True)
+            for command in ('MV60', 'MVUP', 'SIPHONO', 'Z2MUON', 'Z255'):
+                await controller._simulate_state_change(command)
+            version = controller._state_version
+            await controller._simulate_state_change('Z2UP')
+            return controller.state, version, controller._state_version
+
+        state, version, version_after_unknown = asyncio.run(scenario())
+
+        assert (state.volume, state.input_source, state.zone2_muted, state.zone2_volume) == (61, 'PHONO', True, 55)
+        assert version == 5
+        assert version_after_unknown == version
+
+    def test_debug_mode_does_not_poll(self):
+        """Test that a simulated connection doesn't start the polling task"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5, debug_mode=True)
+            connected = await controller.connect()
+            polling_task = controller._polling_task
+            await controller.disconnect()
+            return connected, polling_task
+
+        connected, polling_task = asyncio.run(scenario())
+
+        assert connected == True
+        assert polling_task is None
+
+    def test_callbacks_run_outside_state_lock(self):
+        """Test that state callbacks don't block other state access"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            lock_held = []
+
+            async def callback(state):
+                lock_held.append(controller._state_lock.locked())
+
+            controller.add_state_callback(callback)
+            await controller._update_state_from_response('MUON')
+            return lock_held
+
+        assert asyncio.run(scenario()) == [False]
+
+    def test_removed_callback_is_not_notified(self):
+        """Test that callbacks can be registered once and removed again"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            calls = []
+
+            class Subscriber:
+                def on_update(self, state):
+                    calls.append(state.volume)
+
+            subscriber = Subscriber()
+            controller.add_state_callback(subscriber.on_update)
+            controller.add_state_callback(subscriber.on_update)
+            await controller._update_state_from_response('MV40')
+            controller.remove_state_callback(subscriber.on_update)
+            controller.remove_state_callback(subscriber.on_update)
+            await controller._update_state_from_response('MV41')
+            return calls
+
+        assert asyncio.run(scenario()) == [40]
+
+    def test_async_callbacks_run_concurrently(self):
+        """Test that async callbacks are awaited together and failures are isolated"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            both_started = asyncio.Event()
+            started = []
+            finished = []
+
+            def make_subscriber(name):
+                async def subscriber(state):
+                    started.append(name)
+                    if len(started) == 2:
+                        both_started.set()
+                    # Only completes if the other subscriber runs while this one waits
+                    await asyncio.wait_for(both_started.wait(), 1)
+                    finished.append(name)
+                return subscriber
+
+            async def failing(state):
+                raise RuntimeError("subscriber failed")
+
+            controller.add_state_callback(make_subscriber('first'))
+            controller.add_state_callback(failing)
+            controller.add_state_callback(make_subscriber('second'))
+            await controller._update_state_from_response('MV40')
+            return finished
+
+        assert sorted(asyncio.run(scenario())) == ['first', 'second']
+
+
+class TestAsyncAVRControllerConnect:
+    """Test connection handling in the async AVR controller"""
+
+    @patch('async_avr_controller.asyncio.sleep', new_callable=AsyncMock)
+    @patch('async_avr_controller.random.uniform', side_effect=lambda low, high: high)
+    @patch('async_avr_controller.AsyncTelnetClient')
+    def test_retry_delay_uses_full_jitter(self, mock_telnet_class, mock_uniform, mock_sleep):
+        """Test that retry delays are drawn from zero up to a capped exponential bound"""
+        mock_telnet_class.return_value.open = AsyncMock(side_effect=OSError("Connection refused"))
+        controller = AsyncAVRController('192.168.1.100', 60128, 5, max_retries=5)
+
+        assert asyncio.run(controller.connect()) == False
+
+        caps = [call.args for call in mock_uniform.call_args_list]
+        assert caps == [(0, min(MAX_RETRY_DELAY, INITIAL_RETRY_DELAY * 2 ** n)) for n in range(5)]
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [cap for _, cap in caps]
+
+    def test_connect_queries_initial_state(self):
+        """Test that connecting queries the receiver state and applies the responses"""
+        async def scenario():
+            replies = {'MV?': 'MV45', 'MU?': 'MUOFF', 'PW?': 'PWON', 'SI?': 'SICD'}
+            chunks = []
+
+            async def handle_client(reader, writer):
+                data = await reader.readexactly(16)
+                chunks.append(data)
+                for query in data.decode('ascii').split('\r')[:-1]:
+                    writer.write(replies[query].encode('ascii') + b'\r')
+                await writer.drain()
+                await reader.read()
+                writer.close()
+
+            server = await asyncio.start_server(handle_client, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            controller = AsyncAVRController('127.0.0.1', port, 2)
+            try:
+                await controller.connect()
+                for _ in range(100):
+                    if controller.state.input_source is not None:
+                        break
+                    await asyncio.sleep(0.01)
+                return chunks, controller.get_state_dict()
+            finally:
+                await controller.disconnect()
+                server.close()
+                await server.wait_closed()
+
+        chunks, state = asyncio.run(scenario())
+
+        assert chunks == [b'MV?\rMU?\rPW?\rSI?\r']
+        assert (state['volume'], state['muted'], state['power'], state['input_source']) == (45, False, True, 'CD')
+
+    def test_failed_send_reconnects_and_resends_once(self):
+        """Test that a failed write is retried once on a fresh connection"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            broken = AsyncMock()
+            broken.write.side_effect = ConnectionResetError("Connection reset")
+            fresh = AsyncMock()
+            fresh.write.side_effect = ConnectionResetError("Connection reset again")
+            connections = iter([fresh])
+
+            async def reconnect(retry=True):
+                controller.connection = next(connections)
+                controller.connected = True
+                return True
+
+            controller.connected = True
+            controller.connection = broken
+            with patch.object(controller, 'connect', side_effect=reconnect) as mock_connect:
+                result = await controller.send_command('PWON')
+            return result, mock_connect.call_count, broken.write.call_count, fresh.write.call_count
+
+        (success, message), connects, first_writes, second_writes = asyncio.run(scenario())
+
+        assert success == False
+        assert message == "Connection reset again"
+        assert (connects, first_writes, second_writes) == (1, 1, 1)
+
+    def test_resend_after_reconnect_still_collects_responses(self):
+        """Test that waiters released by the reconnect are registered again for the resend"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            broken = AsyncMock()
+            broken.write.side_effect = ConnectionResetError("Connection reset")
+            fresh = AsyncMock()
+            fresh.write.side_effect = lambda payload: asyncio.get_running_loop().call_soon(
+                controller._dispatch_response, 'PWON')
+
+            async def reconnect(retry=True):
+                # Like a real connect, restarting the reader drops pending waiters
+                controller._drop_pending()
+                controller.connection = fresh
+                controller.connected = True
+                return True
+
+            controller.connected = True
+            controller.connection = broken
+            with patch.object(controller, 'connect', side_effect=reconnect):
+                return await controller.send_and_wait('PWON')
+
+        assert asyncio.run(scenario()) == (True, 'PWON')
+
+    @staticmethod
+    def _replying_connection(controller, replies):
+        """A connection whose writes are answered with replies[payload]"""
+        connection = AsyncMock()
+
+        def write(payload):
+            loop = asyncio.get_running_loop()
+            for reply in replies.get(payload, ()):
+                loop.call_soon(controller._dispatch_response, reply)
+
+        connection.write.side_effect = write
+        return connection
+
+    def test_mvmax_does_not_answer_a_command(self):
+        """Test that the MVMAX line following each volume report is not taken as a response"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            controller.connected = True
+            controller.connection = self._replying_connection(
+                controller, {b'MVUP\rMVUP\r': ('MV51', 'MVMAX 98', 'MV52', 'MVMAX 98')})
+            return await controller.send_and_wait('MVUP\nMVUP')
+
+        assert asyncio.run(scenario()) == (True, 'MV51; MV52')
+
+    def test_poll_reply_does_not_answer_a_later_command(self):
+        """Test that replies to a state poll are matched to the poll, not to a command sent after it"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            controller.connected = True
+            controller.connection = self._replying_connection(
+                controller, {b'MVUP\r': ('MV50', 'MVMAX 98', 'MUOFF', 'PWON', 'SICD', 'MV51')})
+            await controller._request_initial_state()
+            return await controller.send_and_wait('MVUP')
+
+        assert asyncio.run(scenario()) == (True, 'MV51')
+
+    def test_non_network_send_error_keeps_connection(self):
+        """Test that an error unrelated to the socket does not force a reconnect"""
+        async def scenario():
+            controller = AsyncAVRController('192.168.1.100', 60128, 5)
+            connection = AsyncMock()
+            connection.write.side_effect = ValueError("Bad command")
+            controller.connected = True
+            controller.connection = connection
+            with patch.object(controller, 'connect') as mock_connect:
+                result = await controller.send_command('PWON')
+            return result, controller, connection, mock_connect.call_count
+
+        (success, message), controller, connection, connects = asyncio.run(scenario())
+
+        assert (success, message) == (False, "Bad command")
+        assert controller.connected == True
+        assert controller.connection is connection
+        assert connects == 0
+
@@ -1,154 +1,247 @@
+import socket
+import threading
+import time
 import pytest
-from unittest.mock import Mock, patch
 from avr_controller import AVRController
+from tests.fakes import FakeTelnetClient
+
+MVUP = b'MVUP\r'
+TWO_MVUP = (MVUP,) * 2
+THREE_MVUP = (MVUP,) * 3
 
 
 class TestAVRControllerLogic:
     """Test AVR controller logic and behavior"""
 
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.controller = AVRController('192.168.1.100', 60128, 5)
-        self.debug_controller = AVRController('192.168.1.100', 60128, 5, debug_mode=True)
-
-    def test_debug_mode_bypasses_telnet(self):
+    def test_debug_mode_bypasses_telnet(self, debug_controller):
         """Test that debug mode doesn't actually create telnet connections"""
-        result = self.debug_controller.connect()
+        result = debug_controller.connect()
         
         assert result == True
-        assert self.debug_controller.connected == True
+        assert debug_controller.connected == True
         # In debug mode, no actual telnet connection should be created
-        assert self.debug_controller.connection is None
+        assert debug_controller.connection is None
 
-    @patch('avr_controller.TelnetClient')
-    def test_auto_connect_on_send_command(self, mock_telnet_class):
+    def test_auto_connect_on_send_command(self, fake_telnet, controller):
         """Test that send_command automatically connects when needed"""
-        mock_connection = Mock()
-        mock_telnet_class.return_value = mock_connection
-
         # Start disconnected
-        assert self.controller.connected == False
+        assert controller.connected == False
 
-        success, message = self.controller.send_command('PWON')
+        success, message = controller.send_command('PWON')
 
         # Should auto-connect and succeed
         assert success == True
-        assert self.controller.connected == True
-        mock_telnet_class.assert_called_once()
+        assert controller.connected == True
+        assert fake_telnet.created == 1
 
-    @patch('avr_controller.TelnetClient')
-    def test_connection_failure_handling(self, mock_telnet_class):
+    def test_connection_failure_handling(self, fake_telnet, controller, monkeypatch):
         """Test proper handling of connection failures"""
-        mock_connection = Mock()
-        mock_connection.open.side_effect = Exception("Network unreachable")
-        mock_telnet_class.return_value = mock_connection
+        monkeypatch.setattr('avr_controller.time.sleep', lambda seconds: None)
+        fake_telnet.open_error = Exception("Network unreachable")
 
-        success, message = self.controller.send_command('PWON')
+        success, message = controller.send_command('PWON')
 
         assert success == False
         # Updated: error message now includes details (improved behavior)
         assert "Not connected to AVR" in message
         assert "Network unreachable" in message
-        assert self.controller.connected == False
+        assert controller.connected == False
 
-    @patch('avr_controller.TelnetClient')
-    def test_command_encoding_with_carriage_return(self, mock_telnet_class):
+    def test_command_encoding_with_carriage_return(self, fake_telnet, controller):
         """Test that commands are properly encoded with carriage return"""
-        mock_connection = Mock()
-        mock_telnet_class.return_value = mock_connection
-        self.controller.connect()
+        controller.connect()
 
-        self.controller.send_command('PWON')
+        controller.send_command('PWON')
 
         # Should send command with \r and proper encoding
-        mock_connection.write.assert_called_once_with(b'PWON\r')
+        assert fake_telnet.writes == [b'PWON\r']
 
-    @patch('avr_controller.TelnetClient')
-    def test_multi_line_command_processing(self, mock_telnet_class):
-        """Test that multi-line commands are split and sent separately"""
-        mock_connection = Mock()
-        mock_connection.read_until.side_effect = [b'MVUP\r', b'MVUP\r', b'MVUP\r']
-        mock_telnet_class.return_value = mock_connection
-        self.controller.connect()
+    def test_multi_line_command_processing(self, fake_telnet, controller):
+        """Test that multi-line commands are sent together in a single write"""
+        fake_telnet.responses = iter(THREE_MVUP)
+        controller.connect()
 
-        success, response = self.controller.send_and_wait('MVUP\nMVUP\nMVUP')
+        success, response = controller.send_and_wait('MVUP\nMVUP\nMVUP')
 
         assert success == True
         assert response == 'MVUP; MVUP; MVUP'
-        # Should have sent 3 separate commands
-        assert mock_connection.write.call_count == 3
-        mock_connection.write.assert_any_call(b'MVUP\r')
+        # Should have sent the 3 commands together in one write
+        assert fake_telnet.writes == [b''.join(THREE_MVUP)]
 
-    @patch('avr_controller.TelnetClient')
-    def test_empty_lines_in_multi_command_ignored(self, mock_telnet_class):
+    def test_empty_lines_in_multi_command_ignored(self, fake_telnet, controller):
         """Test that empty lines in multi-line commands are ignored"""
-        mock_connection = Mock()
-        mock_connection.read_until.side_effect = [b'MVUP\r', b'MVUP\r']
-        mock_telnet_class.return_value = mock_connection
-        self.controller.connect()
+        fake_telnet.responses = iter(TWO_MVUP)
+        controller.connect()
 
         # Command with empty lines should only send non-empty commands
-        success, response = self.controller.send_and_wait('MVUP\n\nMVUP\n')
+        success, response = controller.send_and_wait('MVUP\n\nMVUP\n')
 
         assert success == True
         # Should only send 2 commands, ignoring empty lines
-        assert mock_connection.write.call_count == 2
+        assert fake_telnet.writes == [b''.join(TWO_MVUP)]
 
-    def test_debug_mode_command_printing(self):
+    def test_missing_response_times_out_without_disconnecting(self, fake_telnet, controller):
+        """Test that send_and_wait stops at the deadline when a response never arrives"""
+        fake_telnet.responses = iter((b'MV51\r', socket.timeout('timed out')))
+        controller.connect()
+
+        success, response = controller.send_and_wait('MVUP\nMVUP', wait_time=0.5)
+
+        assert success == True
+        assert response == 'MV51'
+        assert controller.connected == True
+        # Both commands go out before any response is read
+        assert fake_telnet.writes == [b''.join(TWO_MVUP)]
+        # Each read is bounded by what is left of wait_time
+        assert all(timeout <= 0.5 for timeout in fake_telnet.read_timeouts)
+
+    def test_debug_mode_command_printing(self, debug_controller):
         """Test that debug mode prints commands instead of sending them"""
-        self.debug_controller.connect()
+        debug_controller.connect()
         
         # Should not raise exceptions and return success
-        success, message = self.debug_controller.send_command('PWON')
+        success, message = debug_controller.send_command('PWON')
         
         assert success == True
         assert message == "Debug mode - command printed"
 
-    @patch('avr_controller.TelnetClient')
-    def test_connection_error_during_send_sets_disconnected(self, mock_telnet_class):
+    def test_debug_mode_send_and_wait_does_not_sleep(self, debug_controller, monkeypatch):
+        """Test that debug mode doesn't wait for responses that never come"""
+        sleeps = []
+        monkeypatch.setattr('avr_controller.time.sleep', sleeps.append)
+
+        success, response = debug_controller.send_and_wait('MVUP\nMVUP')
+
+        assert success == True
+        assert response == 'DEBUG: Simulated response; DEBUG: Simulated response'
+        assert sleeps == []
+
+    def test_connection_error_during_send_sets_disconnected(self, fake_telnet, controller, monkeypatch):
         """Test that connection errors during send properly set disconnected state"""
-        mock_connection = Mock()
-        mock_connection.write.side_effect = Exception("Connection lost")
-        mock_telnet_class.return_value = mock_connection
-        self.controller.connect()
+        monkeypatch.setattr('avr_controller.time.sleep', lambda seconds: None)
+        fake_telnet.write_error = ConnectionError("Connection lost")
+        controller.connect()
 
-        success, message = self.controller.send_command('PWON')
+        success, message = controller.send_command('PWON')
 
         assert success == False
-        assert self.controller.connected == False
+        assert controller.connected == False
 
-    @patch('avr_controller.TelnetClient')
-    def test_multi_command_failure_stops_execution(self, mock_telnet_class):
-        """Test that if one command in a multi-command sequence fails, execution stops"""
-        # Disable retry logic for this test by setting max_retries=0
-        controller = AVRController('192.168.1.100', 60128, 5, max_retries=0)
+    def test_non_network_send_error_keeps_connection(self, fake_telnet, controller):
+        """Test that an error unrelated to the socket does not force a reconnect"""
+        fake_telnet.write_error = ValueError("Bad command")
+        controller.connect()
 
-        mock_connection = Mock()
-        # First command succeeds, second fails
-        def side_effect_send(*args):
-            if mock_connection.write.call_count == 1:
-                return
-            else:
-                raise Exception("Connection lost")
+        success, message = controller.send_command('PWON')
 
-        mock_connection.write.side_effect = side_effect_send
-        mock_telnet_class.return_value = mock_connection
+        assert success == False
+        assert message == "Bad command"
+        assert controller.connected == True
+        assert controller.connection is fake_telnet
+        assert fake_telnet.created == 1
+
+    def test_multi_command_failure_stops_execution(self, fake_telnet):
+        """Test that if sending a multi-command sequence fails, no responses are awaited"""
+        # Disable retry logic for this test by setting max_retries=0
+        controller = AVRController('192.168.1.100', 60128, 5, max_retries=0)
+        fake_telnet.write_error = ConnectionError("Connection lost")
         controller.connect()
 
         success, message = controller.send_and_wait('MVUP\nMVUP\nMVUP')
 
         assert success == False
-        # Should stop after first failure, not attempt remaining commands
-        assert mock_connection.write.call_count == 2
+        assert message == "Connection lost"
+        # Should stop after the failure, not wait for responses
+        assert fake_telnet.read_timeouts == []
 
-    @patch('avr_controller.TelnetClient')
-    def test_response_decoding_strips_whitespace(self, mock_telnet_class):
+    def test_response_decoding_strips_whitespace(self, fake_telnet, controller):
         """Test that responses are properly decoded and whitespace stripped"""
-        mock_connection = Mock()
-        mock_connection.read_until.return_value = b'  PWON  \r\n'
-        mock_telnet_class.return_value = mock_connection
-        self.controller.connect()
+        fake_telnet.responses = iter((b'  PWON  \r\n',))
+        controller.connect()
+
+        response = controller.read_response()
+
+        assert response == 'PWON'  # Should be stripped of whitespace
+
+    @pytest.mark.slow
+    def test_concurrent_connects_share_one_attempt(self, fake_telnet, controller):
+        """Test that threads connecting at the same time open a single connection"""
+        fake_telnet.open = lambda connect_timeout: time.sleep(0.2)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(controller.connect()))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [True, True, True]
+        assert fake_telnet.created == 1
+
+    @pytest.mark.slow
+    def test_concurrent_requests_do_not_interleave(self, fake_telnet, controller):
+        """Test that a request's writes and reads complete before the next request writes"""
+        events = []
+        fake_telnet.write = lambda data: events.append(('write', data))
+
+        def read_until(delimiter, timeout):
+            time.sleep(0.1)
+            events.append(('read', None))
+            return b'PWON\r'
+
+        fake_telnet.read_until = read_until
+        controller.connect()
+
+        # Leave a gap between reads in which another thread could get in
+        read_response = controller.read_response
+
+        def slow_read_response(timeout):
+            response = read_response(timeout)
+            time.sleep(0.05)
+            return response
+
+        controller.read_response = slow_read_response
+
+        first = threading.Thread(target=controller.send_and_wait, args=('PWON\nSICD',))
+        second = threading.Thread(target=controller.send_and_wait, args=('MUON',))
+        first.start()
+        time.sleep(0.02)
+        second.start()
+        first.join()
+        second.join()
+
+        assert events == [('write', b'PWON\rSICD\r'), ('read', None), ('read', None),
+                          ('write', b'MUON\r'), ('read', None)]
+
+    def test_reconnect_replaces_open_connection(self, controller, monkeypatch):
+        """Test that connecting again closes the previous connection"""
+        first, second = FakeTelnetClient(), FakeTelnetClient()
+        clients = iter([first, second])
+        monkeypatch.setattr('avr_controller.TelnetClient', lambda *args, **kwargs: next(clients))
+        controller.connect()
+
+        assert controller.connect() == True
+        assert first.close_count == 1
+        assert controller.connection is second
+
+    def test_connect_uses_full_timeout_only_on_last_attempt(self, fake_telnet, controller, monkeypatch):
+        """Test that early connect attempts fail fast and the last one waits the full timeout"""
+        monkeypatch.setattr('avr_controller.time.sleep', lambda seconds: None)
+        fake_telnet.open_error = Exception("Network unreachable")
+
+        assert controller.connect() == False
+
+        assert fake_telnet.connect_timeouts == [0.5, 0.5, 0.5, None]
+
+    def test_failed_connect_cools_down_before_next_attempt(self, fake_telnet):
+        """Test that a failed connect refuses new attempts until the cooldown expires"""
+        controller = AVRController('192.168.1.100', 60128, 5, max_retries=0)
+        fake_telnet.open_error = Exception("Network unreachable")
 
-        response = self.controller.read_response()
+        assert controller.connect() == False
+        assert controller.connect() == False
 
-        assert response == 'PWON'  # Should be stripped of whitespace
\ No newline at end of file
+        # Second call is answered from the cooldown without a new TCP connect
+        assert fake_telnet.created == 1
+        assert "Network unreachable" in controller.last_error
@@ -0,0 +1,103 @@
+import itertools
+import pytest
+from command_validator import (
+    FROZEN_COMMANDS, MAX_COMMAND_LENGTH, VALID_COMMAND_PATTERN, sanitize_command, validate_command,
+    validate_custom_command
+)
+
+
+class TestCommandValidation:
+    """Test validation and sanitization of receiver commands"""
+
+    @pytest.mark.parametrize('command', [
+        'PWON', 'PWSTANDBY', 'MVUP', 'MVDOWN', 'MV52', 'MV505', 'SIPHONO', 'MSSTEREO'
+    ])
+    def test_known_commands_are_valid(self, command):
+        """Test that typical Denon/Marantz commands pass validation"""
+        assert validate_command(command) == (True, None)
+
+    @pytest.mark.parametrize('command', ['ABCDEFGHIJUP', 'ABCDEFGHIJDOWN', 'ABCDEFGHIJOFF'])
+    def test_word_suffix_extends_letter_limit(self, command):
+        """Test that UP/DOWN/ON/OFF may follow the full ten letters"""
+        assert validate_command(command) == (True, None)
+
+    @pytest.mark.slow
+    def test_grammar_check_agrees_with_pattern(self):
+        """Test that validation accepts exactly what VALID_COMMAND_PATTERN matches"""
+        for length in range(6):
+            for chars in itertools.product('AONUPD05x', repeat=length):
+                command = ''.join(chars)
+                expected = bool(VALID_COMMAND_PATTERN.fullmatch(command))
+                assert validate_command(command)[0] == expected, command
+
+    @pytest.mark.parametrize('command', ['mvup', 'M', 'MV1234', 'MV5A', 'ABCDEFGHIJKL5',
+                                         'ABCDEFGHIJKUP', 'MV\u0665'])
+    def test_malformed_commands_are_rejected(self, command):
+        """Test that commands outside the expected grammar are rejected"""
+        is_valid, error_msg = validate_command(command)
+
+        assert is_valid == False
+        assert 'does not match expected pattern' in error_msg
+
+    @pytest.mark.parametrize('command', ['PWON;', 'PW|ON', 'MV$50', 'PWON\n', 'PW\x00ON'])
+    def test_forbidden_characters_are_reported(self, command):
+        """Test that injection characters are rejected with a specific reason"""
+        is_valid, error_msg = validate_command(command)
+
+        assert is_valid == False
+        assert 'forbidden characters' in error_msg
+
+    def test_overlong_command_is_rejected(self):
+        """Test that commands longer than the limit are rejected before matching"""
+        is_valid, error_msg = validate_command('A' * (MAX_COMMAND_LENGTH + 1))
+
+        assert is_valid == False
+        assert 'maximum length' in error_msg
+
+    @pytest.mark.parametrize('command', ['PWON', 'SIPHONO', 'MV50', 'MV505'])
+    def test_known_commands_are_accepted(self, command):
+        """Test that commands from the known vocabulary are accepted"""
+        assert validate_command(command) == (True, None)
+
+    @pytest.mark.parametrize('command', ['Z2UP', 'Z2MUOFF', 'Z252', 'Z250', 'SICBL/SAT'])
+    def test_preset_commands_outside_the_grammar_are_rejected(self, command):
+        """Test that a preset using a command doesn't make it valid"""
+        is_valid, _ = validate_command(command)
+
+        assert is_valid == False
+
+    def test_known_commands_all_match_the_grammar(self):
+        """Test that the known command lookup never accepts more than the grammar"""
+        assert all(VALID_COMMAND_PATTERN.fullmatch(command) for command in FROZEN_COMMANDS)
+
+    def test_multi_line_command_reports_failing_line(self):
+        """Test that a multi-line command names the first invalid line"""
+        is_valid, error_msg = validate_custom_command('MVUP\nMV$1\nMUON')
+
+        assert is_valid == False
+        assert "Invalid command 'MV$1'" in error_msg
+
+    def test_multi_line_command_ignores_blank_lines(self):
+        """Test that blank and padded lines in a multi-line command are accepted"""
+        assert validate_custom_command('MVUP\n\n  MVDOWN \n') == (True, None)
+
+    def test_multi_line_command_accepts_crlf_line_endings(self):
+        """Test that CRLF line endings in a multi-line command are accepted"""
+        assert validate_custom_command('PWON\r\nSICD\r\nMV50\r\n') == (True, None)
+
+    def test_multi_line_command_reports_line_with_non_ascii_digits(self):
+        """Test that a line the sequence scan rejects is still reported"""
+        is_valid, error_msg = validate_custom_command('MVUP\nMV\u0665\u0660')
+
+        assert is_valid == False
+        assert "Invalid command 'MV\u0665\u0660'" in error_msg
+
+    def test_multi_line_rejected_when_not_allowed(self):
+        """Test that newlines are rejected when multi-line input is disabled"""
+        is_valid, _ = validate_custom_command('MVUP\nMVUP', allow_multiline=False)
+
+        assert is_valid == False
+
+    def test_sanitize_strips_control_and_forbidden_characters(self):
+        """Test that sanitizing removes dangerous characters and uppercases"""
+        assert sanitize_command('  pw;on\x07 ') == 'PWON'
@@ -7,74 +7,45 @@ from config import Config
 class TestConfig:
     """Test configuration management"""
 
-    def test_default_config_values(self):
-        """Test default configuration values"""
-        with patch.object(sys, 'argv', ['app.py']):
+    @pytest.mark.parametrize('argv,env,expected', [
+        (
+            ['app.py'],
+            {},
+            {'AVR_HOST': '192.168.1.100', 'AVR_PORT': 60128, 'AVR_TIMEOUT': 5,
+             'HOST': 'localhost', 'PORT': 5000, 'DEBUG': False},
+        ),
+        (
+            ['app.py', '--avr-host', '192.168.1.50', '--avr-port', '23', '--avr-timeout', '10',
+             '--host', '0.0.0.0', '--port', '8080', '--debug'],
+            {},
+            {'AVR_HOST': '192.168.1.50', 'AVR_PORT': 23, 'AVR_TIMEOUT': 10,
+             'HOST': '0.0.0.0', 'PORT': 8080, 'DEBUG': True},
+        ),
+        (
+            ['app.py'],
+            {'AVR_HOST': '192.168.1.200', 'AVR_PORT': '8102', 'HOST': '127.0.0.1', 'PORT': '3000'},
+            {'AVR_HOST': '192.168.1.200', 'AVR_PORT': 8102, 'HOST': '127.0.0.1', 'PORT': 3000},
+        ),
+        (
+            ['app.py', '--avr-host', '192.168.1.50', '--avr-port', '23'],
+            {'AVR_HOST': '192.168.1.200', 'AVR_PORT': '8102'},
+            {'AVR_HOST': '192.168.1.50', 'AVR_PORT': 23},
+        ),
+    ], ids=['defaults', 'cli', 'env', 'cli_over_env'])
+    def test_config_sources(self, argv, env, expected):
+        """Test defaults, command line args, environment variables and their precedence"""
+        with patch.object(sys, 'argv', argv), patch.dict('os.environ', env):
             config = Config()
-            
-            assert config.AVR_HOST == '192.168.1.100'
-            assert config.AVR_PORT == 60128
-            assert config.AVR_TIMEOUT == 5
-            assert config.HOST == 'localhost'
-            assert config.PORT == 5000
-            assert config.DEBUG == False
 
-    def test_command_line_args(self):
-        """Test command line argument parsing"""
-        test_args = [
-            'app.py',
-            '--avr-host', '192.168.1.50',
-            '--avr-port', '23',
-            '--avr-timeout', '10',
-            '--host', '0.0.0.0',
-            '--port', '8080',
-            '--debug'
-        ]
-        
-        with patch.object(sys, 'argv', test_args):
-            config = Config()
-            
-            assert config.AVR_HOST == '192.168.1.50'
-            assert config.AVR_PORT == 23
-            assert config.AVR_TIMEOUT == 10
-            assert config.HOST == '0.0.0.0'
-            assert config.PORT == 8080
-            assert config.DEBUG == True
+        assert {name: getattr(config, name) for name in expected} == expected
+
+    def test_cors_origins_parsed_once_from_environment(self):
+        """Test that CORS origins are split into a list, or kept as '*'"""
+        with patch.dict('os.environ', {'CORS_ORIGINS': 'http://a.local, http://b.local,'}):
+            config = Config(parse_args=False)
+
+            assert config.CORS_ORIGINS == ['http://a.local', 'http://b.local']
 
-    def test_environment_variables(self):
-        """Test environment variable configuration"""
-        env_vars = {
-            'AVR_HOST': '192.168.1.200',
-            'AVR_PORT': '8102',
-            'HOST': '127.0.0.1',
-            'PORT': '3000'
-        }
-        
-        with patch.dict('os.environ', env_vars):
-            with patch.object(sys, 'argv', ['app.py']):
-                config = Config()
-                
-                assert config.AVR_HOST == '192.168.1.200'
-                assert config.AVR_PORT == 8102
-                assert config.HOST == '127.0.0.1'
-                assert config.PORT == 3000
+        with patch.dict('os.environ', {'CORS_ORIGINS': '*'}):
+            assert Config(parse_args=False).CORS_ORIGINS == '*'
 
-    def test_command_line_overrides_env(self):
-        """Test that command line args override environment variables"""
-        env_vars = {
-            'AVR_HOST': '192.168.1.200',
-            'AVR_PORT': '8102'
-        }
-        
-        test_args = [
-            'app.py',
-            '--avr-host', '192.168.1.50',
-            '--avr-port', '23'
-        ]
-        
-        with patch.dict('os.environ', env_vars):
-            with patch.object(sys, 'argv', test_args):
-                config = Config()
-                
-                assert config.AVR_HOST == '192.168.1.50'
-                assert config.AVR_PORT == 23
\ No newline at end of file
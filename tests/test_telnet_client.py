@@ -0,0 +1,119 @@
+import inspect
+import socket
+import threading
+import pytest
+from telnet_client import TelnetClient
+from tests.fakes import FakeTelnetClient
+
+
+class TestTelnetClient:
+    """Test the socket-based telnet client against a local server"""
+
+    def setup_method(self):
+        """Set up a listening socket and a connected client"""
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.client = TelnetClient('127.0.0.1', self.server.getsockname()[1], 2)
+        self.client.open()
+        self.peer, _ = self.server.accept()
+
+    def teardown_method(self):
+        """Close all sockets"""
+        self.client.close()
+        self.peer.close()
+        self.server.close()
+
+    def test_write_many_sends_chunks_in_order(self):
+        """Test that write_many delivers all chunks as one byte stream"""
+        self.client.write_many([b'MVUP\r', b'MUOFF\r', b'SICD\r'])
+
+        received = b''
+        while len(received) < 16:
+            received += self.peer.recv(1024)
+
+        assert received == b'MVUP\rMUOFF\rSICD\r'
+
+    def test_write_many_sends_large_chunks_completely(self):
+        """Test that chunks larger than the socket buffer are sent in full"""
+        chunks = [bytes([i]) * 1_000_000 for i in range(1, 4)]
+        received = bytearray()
+
+        def drain():
+            while len(received) < 3_000_000:
+                received.extend(self.peer.recv(65536))
+
+        reader = threading.Thread(target=drain)
+        reader.start()
+        self.client.write_many(chunks)
+        reader.join(timeout=5)
+
+        assert bytes(received) == b''.join(chunks)
+
+    def test_open_replaces_existing_connection(self):
+        """Test that opening a connected client closes the old socket first"""
+        old_socket = self.client.socket
+        self.client.open()
+        new_peer, _ = self.server.accept()
+
+        try:
+            assert old_socket.fileno() == -1
+            self.client.write(b'PW?\r')
+            assert new_peer.recv(1024) == b'PW?\r'
+        finally:
+            new_peer.close()
+
+    def test_read_until_keeps_data_after_delimiter(self):
+        """Test that responses arriving together are returned one at a time"""
+        self.peer.sendall(b'MV51\rMVMAX 98\r')
+
+        assert self.client.read_until(b'\r') == b'MV51\r'
+        assert self.client.read_until(b'\r') == b'MVMAX 98\r'
+
+    def test_read_until_finds_delimiter_split_across_receives(self):
+        """Test that a delimiter split between two receives ends the first response"""
+        self.peer.sendall(b'A\r')
+        timer = threading.Timer(0.1, self.peer.sendall, args=(b'\nX\r\n',))
+        timer.start()
+
+        try:
+            assert self.client.read_until(b'\r\n') == b'A\r\n'
+            assert self.client.read_until(b'\r\n') == b'X\r\n'
+        finally:
+            timer.join()
+
+    def test_read_until_keeps_partial_response_after_timeout(self):
+        """Test that a response split around a timeout is not lost"""
+        self.peer.sendall(b'MV5')
+        with pytest.raises(socket.timeout):
+            self.client.read_until(b'\r', timeout=0.1)
+
+        self.peer.sendall(b'1\r')
+
+        assert self.client.read_until(b'\r') == b'MV51\r'
+
+
+# Public methods of TelnetClient, plus the constructor
+TELNET_CLIENT_METHODS = ['__init__'] + sorted(
+    name for name, _ in inspect.getmembers(TelnetClient, inspect.isfunction)
+    if not name.startswith('_'))
+
+
+class TestFakeTelnetClient:
+    """Test that the fake used by the controller tests matches the real client"""
+
+    def test_fake_covers_every_public_method(self):
+        """Test that the fake has every public method of TelnetClient"""
+        missing = [name for name in TELNET_CLIENT_METHODS
+                   if not inspect.isfunction(getattr(FakeTelnetClient, name, None))]
+
+        assert missing == []
+
+    @pytest.mark.parametrize('name', TELNET_CLIENT_METHODS)
+    def test_fake_methods_match_telnet_client(self, name):
+        """Test that each public method takes the same parameters as TelnetClient's"""
+        def parameters(cls):
+            signature = inspect.signature(getattr(cls, name))
+            return [(p.name, p.kind) for p in signature.parameters.values()]
+
+        assert parameters(FakeTelnetClient) == parameters(TelnetClient)